@@ -0,0 +1,438 @@
+"""Coordinator/worker mode for spreading ``process_post`` across machines.
+
+The coordinator owns the corpus and hands out leases on contiguous ranges of
+post IDs. Workers connect over TCP, process every post of their lease and
+stream one result per post back. A lease that sees no traffic for
+``lease_timeout`` seconds (or whose worker disconnects) is put back in the
+queue; results are keyed by post ID so re-processed posts are de-duplicated.
+
+Protocol: one JSON object per line. Worker requests and coordinator replies::
+
+    {"op": "hello", "worker": ID}                  -> {"op": "welcome"}
+    {"op": "lease"}                                -> {"op": "lease", "lease": N, "range": [a, b],
+                                                       "items": [[id, post], ...],
+                                                       "stages": [...], "policy": P}
+                                                    | {"op": "wait", "retry": seconds}
+                                                    | {"op": "done"}
+    {"op": "result", "lease": N, "id": ID, "result": {...}}   (no reply)
+    {"op": "result", "lease": N, "id": ID, "error": "..."}    (no reply)
+    {"op": "complete", "lease": N}                 -> {"op": "ack"}
+
+A post whose processing raises is reported with ``error`` and stored as
+``{"error": ...}``, so one bad post cannot make its chunk retry forever.
+Completing a lease that still has posts without results puts the chunk back
+in the queue.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .interface import POLICIES, STAGES, parse_stages, process_post
+
+
+@dataclass
+class Lease:
+    lease_id: int
+    chunk: int
+    worker: str
+    deadline: float
+
+
+@dataclass
+class WorkerStats:
+    processed: int = 0
+    errors: int = 0
+    leases: int = 0
+    first_seen: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        coordinator: Coordinator = self.server.coordinator
+        worker = f"{self.client_address[0]}:{self.client_address[1]}"
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    continue
+                if message.get("op") == "hello":
+                    worker = str(message.get("worker") or worker)
+                reply = coordinator.dispatch(worker, message)
+                if reply is not None:
+                    self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            coordinator.release(worker)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Coordinator:
+    """Hands out leased chunks of ``posts`` and collects de-duplicated results."""
+
+    def __init__(
+        self,
+        posts: Sequence[str],
+        chunk_size: int = 50,
+        lease_timeout: float = 30.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        stages=None,
+        policy: str = "full",
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.posts = list(posts)
+        self.chunk_size = chunk_size
+        self.lease_timeout = lease_timeout
+        self.stages = parse_stages(stages)
+        self.policy = policy
+        self.results: Dict[int, Any] = {}
+        self.duplicates = 0
+        self.requeued = 0
+        self.errors = 0
+        self.workers: Dict[str, WorkerStats] = {}
+
+        self._chunks: List[Tuple[int, int]] = [
+            (start, min(start + chunk_size, len(self.posts)))
+            for start in range(0, len(self.posts), chunk_size)
+        ]
+        self._remaining = [end - start for start, end in self._chunks]
+        self._pending = deque(range(len(self._chunks)))
+        self._leases: Dict[int, Lease] = {}
+        self._lease_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if not self.posts:
+            self._finished.set()
+        self._started = time.monotonic()
+        self._ended: Optional[float] = None
+
+        self._server = _Server((host, port), _Handler)
+        self._server.coordinator = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> Tuple[str, int]:
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.address
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every post has a result (or ``timeout`` elapses)."""
+
+        return self._finished.wait(timeout)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "Coordinator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # protocol -----------------------------------------------------------
+    def dispatch(self, worker: str, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        op = message.get("op")
+        with self._lock:
+            stats = self.workers.setdefault(worker, WorkerStats())
+            stats.last_seen = time.monotonic()
+            if op == "hello":
+                return {"op": "welcome"}
+            if op == "lease":
+                return self._grant(worker, stats)
+            if op == "result":
+                self._record(worker, stats, message)
+                return None
+            if op == "complete":
+                self._complete(worker, message.get("lease"))
+                return {"op": "ack"}
+        return {"op": "error", "error": f"unknown op {op!r}"}
+
+    def _grant(self, worker: str, stats: WorkerStats) -> Dict[str, Any]:
+        self._reclaim_expired()
+        while self._pending:
+            chunk = self._pending.popleft()
+            if self._remaining[chunk] == 0:
+                continue
+            lease = Lease(next(self._lease_ids), chunk, worker, time.monotonic() + self.lease_timeout)
+            self._leases[lease.lease_id] = lease
+            stats.leases += 1
+            start, end = self._chunks[chunk]
+            return {
+                "op": "lease",
+                "lease": lease.lease_id,
+                "range": [start, end],
+                "items": [[i, self.posts[i]] for i in range(start, end) if i not in self.results],
+                "stages": list(self.stages),
+                "policy": self.policy,
+            }
+        if self._finished.is_set():
+            return {"op": "done"}
+        return {"op": "wait", "retry": min(1.0, self.lease_timeout / 4)}
+
+    def _record(self, worker: str, stats: WorkerStats, message: Dict[str, Any]) -> None:
+        lease = self._leases.get(message.get("lease"))
+        if lease is not None and lease.worker == worker:
+            # every streamed result doubles as a heartbeat for the lease
+            lease.deadline = time.monotonic() + self.lease_timeout
+        post_id = message.get("id")
+        if not isinstance(post_id, int) or not 0 <= post_id < len(self.posts):
+            return
+        if post_id in self.results:
+            self.duplicates += 1
+            return
+        if "error" in message:
+            self.results[post_id] = {"error": str(message["error"])}
+            self.errors += 1
+            stats.errors += 1
+        else:
+            self.results[post_id] = message.get("result")
+        stats.processed += 1
+        chunk = post_id // self.chunk_size
+        self._remaining[chunk] -= 1
+        if len(self.results) == len(self.posts):
+            self._ended = time.monotonic()
+            self._finished.set()
+
+    def _complete(self, worker: str, lease_id: Any) -> None:
+        lease = self._leases.get(lease_id)
+        if lease is None or lease.worker != worker:
+            # expired and re-leased, or someone else's: leave it alone
+            return
+        # requeues the chunk if the worker skipped any of its posts
+        self._requeue(lease_id)
+
+    def _reclaim_expired(self) -> None:
+        now = time.monotonic()
+        for lease_id, lease in list(self._leases.items()):
+            if lease.deadline <= now:
+                self._requeue(lease_id)
+
+    def _requeue(self, lease_id: int) -> None:
+        lease = self._leases.pop(lease_id)
+        if self._remaining[lease.chunk]:
+            self._pending.appendleft(lease.chunk)
+            self.requeued += 1
+
+    def release(self, worker: str) -> None:
+        """Requeue the leases of a disconnected worker."""
+
+        with self._lock:
+            for lease_id, lease in list(self._leases.items()):
+                if lease.worker == worker:
+                    self._requeue(lease_id)
+
+    # reporting ----------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            elapsed = (self._ended or now) - self._started
+            leased = {lease.worker for lease in self._leases.values()}
+            workers = {}
+            for name, w in self.workers.items():
+                active = max(now - w.first_seen, 1e-9)
+                workers[name] = {
+                    "processed": w.processed,
+                    "errors": w.errors,
+                    "leases": w.leases,
+                    "throughput": w.processed / active,
+                    # seconds since a worker holding a lease last reported
+                    "lag": (now - w.last_seen) if name in leased else 0.0,
+                }
+            return {
+                "total": len(self.posts),
+                "completed": len(self.results),
+                "errors": self.errors,
+                "duplicates": self.duplicates,
+                "requeued": self.requeued,
+                "outstanding_leases": len(self._leases),
+                "elapsed": elapsed,
+                "throughput": len(self.results) / elapsed if elapsed > 0 else 0.0,
+                "workers": workers,
+            }
+
+
+def _send(stream, message: Dict[str, Any]) -> None:
+    stream.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def _receive(stream) -> Dict[str, Any]:
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("coordinator closed the connection")
+    return json.loads(line)
+
+
+def run_worker(host: str, port: int, worker_id: Optional[str] = None) -> int:
+    """Process leases from the coordinator until it reports ``done``.
+
+    A coordinator that goes away is treated like ``done``: its unfinished
+    leases are its own to requeue. Returns the number of posts processed.
+    """
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    processed = 0
+    with socket.create_connection((host, port)) as sock, sock.makefile("rwb") as stream:
+        try:
+            _send(stream, {"op": "hello", "worker": worker_id})
+            _receive(stream)
+            while True:
+                _send(stream, {"op": "lease"})
+                reply = _receive(stream)
+                if reply["op"] == "done":
+                    return processed
+                if reply["op"] == "wait":
+                    time.sleep(reply["retry"])
+                    continue
+                for post_id, post in reply["items"]:
+                    message = {"op": "result", "lease": reply["lease"], "id": post_id}
+                    try:
+                        message["result"] = process_post(post, stages=reply["stages"], policy=reply["policy"])
+                    except Exception as exc:
+                        message["error"] = f"{type(exc).__name__}: {exc}"
+                    _send(stream, message)
+                    processed += 1
+                _send(stream, {"op": "complete", "lease": reply["lease"]})
+                _receive(stream)
+        except ConnectionError:
+            return processed
+
+
+def _worker_process(host: str, port: int, worker_id: str) -> None:
+    run_worker(host, port, worker_id)
+
+
+def run_local(
+    posts: Sequence[str],
+    workers: int = 4,
+    chunk_size: int = 50,
+    lease_timeout: float = 30.0,
+    stages=None,
+    policy: str = "full",
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[int, Any], Dict[str, Any]]:
+    """Run a coordinator plus ``workers`` local processes standing in for nodes.
+
+    Raises ``RuntimeError`` if every worker exits (or ``timeout`` seconds
+    pass) while posts are still without a result.
+    """
+
+    from multiprocessing import get_context
+
+    ctx = get_context("spawn")
+    with Coordinator(posts, chunk_size, lease_timeout, stages=stages, policy=policy) as coordinator:
+        host, port = coordinator.address
+        procs = [
+            ctx.Process(target=_worker_process, args=(host, port, f"local-{n}"), daemon=True)
+            for n in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not coordinator.wait(0.5):
+            if not any(p.is_alive() for p in procs) or (deadline is not None and time.monotonic() >= deadline):
+                for p in procs:
+                    p.terminate()
+                stats = coordinator.stats()
+                raise RuntimeError(f"backfill stopped with {stats['completed']}/{stats['total']} posts done")
+        for p in procs:
+            p.join()
+        return coordinator.results, coordinator.stats()
+
+
+def _read_posts(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as fh:
+        return [line.rstrip("\n") for line in fh if line.strip()]
+
+
+def _write_results(path: str, results: Dict[int, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        for post_id in sorted(results):
+            fh.write(json.dumps({"id": post_id, "result": results[post_id]}, ensure_ascii=False) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distributed moderation backfill")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    for name in ("coordinator", "local"):
+        p = sub.add_parser(name)
+        p.add_argument("input", help="Text file with one post per line.")
+        p.add_argument("--output", help="Write results as JSON lines to this file.")
+        p.add_argument("--chunk-size", type=int, default=50)
+        p.add_argument("--lease-timeout", type=float, default=30.0)
+        p.add_argument("--stages", help=f"Comma separated stages (default: {','.join(STAGES)}).")
+        p.add_argument("--policy", choices=POLICIES, default="full",
+                       help="Short-circuit policy applied between stages.")
+    sub.choices["coordinator"].add_argument("--host", default="127.0.0.1")
+    sub.choices["coordinator"].add_argument("--port", type=int, default=8765)
+    sub.choices["local"].add_argument("--workers", type=int, default=4)
+    sub.choices["local"].add_argument("--timeout", type=float, help="Give up after this many seconds.")
+
+    w = sub.add_parser("worker")
+    w.add_argument("--host", default="127.0.0.1")
+    w.add_argument("--port", type=int, default=8765)
+    w.add_argument("--id", dest="worker_id")
+
+    args = parser.parse_args()
+    if args.mode != "worker":
+        try:
+            args.stages = parse_stages(args.stages)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.mode == "worker":
+        print(json.dumps({"processed": run_worker(args.host, args.port, args.worker_id)}))
+        return
+
+    posts = _read_posts(args.input)
+    if args.mode == "local":
+        results, stats = run_local(
+            posts, args.workers, args.chunk_size, args.lease_timeout, args.stages, args.policy, args.timeout
+        )
+    else:
+        coordinator = Coordinator(
+            posts, args.chunk_size, args.lease_timeout, args.host, args.port, args.stages, args.policy
+        )
+        with coordinator:
+            print(f"Coordinator listening on {args.host}:{coordinator.address[1]}", flush=True)
+            while not coordinator.wait(5.0):
+                s = coordinator.stats()
+                print(f"{s['completed']}/{s['total']} posts, {s['throughput']:.1f} posts/s", flush=True)
+            results, stats = coordinator.results, coordinator.stats()
+
+    if args.output:
+        _write_results(args.output, results)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
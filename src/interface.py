@@ -5,62 +5,164 @@ from __future__ import annotations
 import argparse
 import json
 from dataclasses import asdict
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
 
 from .moderation.content_classification_dfa import classify
 from .moderation.content_transformation_fst import transform
 from .moderation.post_validation_cfg import validate_post, render_preview
 
+STAGES = ("classification", "transformation", "validation", "preview")
+
+# full: run every requested stage
+# skip_safe: Safe posts skip transformation and preview
+# first_violation: once a post is a Violation, skip every later stage
+POLICIES = ("full", "skip_safe", "first_violation")
+
+
+def parse_stages(stages: Union[None, str, Iterable[str]]) -> Tuple[str, ...]:
+    """Normalize a stage selection (comma separated or iterable) in pipeline order."""
+
+    if stages is None:
+        return STAGES
+    if isinstance(stages, str):
+        stages = stages.split(",")
+    elif not isinstance(stages, Iterable):
+        raise ValueError(f"Stages must be a string or a list of strings, not {type(stages).__name__}")
+    stages = list(stages)
+    if not all(isinstance(s, str) for s in stages):
+        raise ValueError("Stages must be strings")
+    wanted = {s.strip() for s in stages if s.strip()}
+    unknown = wanted.difference(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    if not wanted:
+        return STAGES
+    return tuple(s for s in STAGES if s in wanted)
+
+
+class ModerationResult(dict):
+    """``process_post`` output that computes unrequested stages on access.
+
+    Requested stages are filled in by :func:`process_post`; indexing any other
+    stage key (``result["preview"]``) runs that stage on demand. ``get``,
+    ``in``, iteration and ``json.dumps`` see only the stages computed so far,
+    like on a plain dict. Intermediate results (classification report, parse)
+    are shared between stages. Stages skipped by a policy are stored as
+    ``None`` and listed in ``skipped``.
+
+    Pickling keeps the computed keys and ``skipped`` but not the cached
+    report and textX parse, so results can cross process-pool boundaries.
+    """
 
-def process_post(post: str) -> Dict[str, Any]:
+    def __init__(self, post: str):
+        super().__init__(original_post=post)
+        self.post = post
+        self.skipped: Tuple[str, ...] = ()
+        self._report = None
+        self._parsed: Optional[Tuple[bool, Any]] = None
+
+    def __reduce__(self):
+        return _restore_result, (self.post, dict(self), self.skipped)
+
+    def __missing__(self, key: str) -> Any:
+        if key not in STAGES:
+            raise KeyError(key)
+        value = getattr(self, f"_build_{key}")()
+        self[key] = value
+        return value
+
+    def compute(self, stage: str) -> Any:
+        return self[stage]
+
+    def skip(self, stage: str) -> None:
+        self[stage] = None
+        self.skipped += (stage,)
+
+    @property
+    def report(self):
+        if self._report is None:
+            self._report = classify(self.post)
+        return self._report
+
+    @property
+    def status(self) -> str:
+        report = self.report
+        return "Violation" if any((report.hate, report.offensive, report.spam)) else "Safe"
+
+    @property
+    def parsed(self) -> Tuple[bool, Any]:
+        if self._parsed is None:
+            self._parsed = validate_post(self.post)
+        return self._parsed
+
+    def _build_classification(self) -> Dict[str, Any]:
+        return {"status": self.status, "details": asdict(self.report)}
+
+    def _build_transformation(self) -> Dict[str, Any]:
+        return asdict(transform(self.post, report=self.report))
+
+    def _build_validation(self) -> Dict[str, Any]:
+        is_valid, validation_obj = self.parsed
+        if is_valid:
+            return {"status": "Valid", "error": None}
+        return {"status": "Invalid", "error": str(validation_obj)}
+
+    def _build_preview(self) -> Optional[str]:
+        is_valid, validation_obj = self.parsed
+        return render_preview(validation_obj) if is_valid else None
+
+
+def _restore_result(post: str, computed: Dict[str, Any], skipped: Tuple[str, ...]) -> ModerationResult:
+    result = ModerationResult(post)
+    result.update(computed)
+    result.skipped = skipped
+    return result
+
+
+def _skipped_by_policy(result: ModerationResult, stage: str, policy: str) -> bool:
+    if policy == "skip_safe":
+        return stage in ("transformation", "preview") and result.status == "Safe"
+    if policy == "first_violation":
+        return stage != "classification" and result.status == "Violation"
+    return False
+
+
+def process_post(
+    post: str,
+    stages: Union[None, str, Iterable[str]] = None,
+    policy: str = "full",
+) -> ModerationResult:
     """Run classification, transformation, and validation on ``post``.
 
     Parameters
     ----------
     post:
         Raw user supplied text.
+    stages:
+        Stages to compute up front (see ``STAGES``); defaults to all of them.
+        Other stages are computed only when indexed (``result["preview"]``);
+        ``result.get(...)`` and ``in`` do not compute them.
+    policy:
+        Short-circuit policy from ``POLICIES``.
 
     Returns
     -------
-    Dict[str, Any]
+    ModerationResult
         Aggregated results containing the original post, classification flag,
         transformation details, validation status, and rendered preview (when
         available).
     """
 
-    classification_report = classify(post)
-    classification_status = (
-        "Violation"
-        if any(
-            (
-                classification_report.hate,
-                classification_report.offensive,
-                classification_report.spam,
-            )
-        )
-        else "Safe"
-    )
-
-    transformation_result = transform(post)
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
 
-    is_valid, validation_obj = validate_post(post)
-    if is_valid:
-        preview = render_preview(validation_obj)
-        validation_payload = {"status": "Valid", "error": None}
-    else:
-        preview = None
-        validation_payload = {"status": "Invalid", "error": str(validation_obj)}
-
-    return {
-        "original_post": post,
-        "classification": {
-            "status": classification_status,
-            "details": asdict(classification_report),
-        },
-        "transformation": asdict(transformation_result),
-        "validation": validation_payload,
-        "preview": preview,
-    }
+    result = ModerationResult(post)
+    for stage in parse_stages(stages):
+        if _skipped_by_policy(result, stage, policy):
+            result.skip(stage)
+        else:
+            result.compute(stage)
+    return result
 
 
 def main() -> None:
@@ -70,13 +172,40 @@ def main() -> None:
         nargs="?",
         help="Post text to process. If omitted, the program prompts for input.",
     )
+    parser.add_argument(
+        "--stages",
+        help=f"Comma separated stages to run (default: {','.join(STAGES)}).",
+    )
+    parser.add_argument(
+        "--policy",
+        choices=POLICIES,
+        default="full",
+        help="Short-circuit policy applied between stages.",
+    )
+    parser.add_argument(
+        "--store",
+        metavar="PATH",
+        help="SQLite result store used to reuse results for unchanged posts and rules.",
+    )
     args = parser.parse_args()
+    try:
+        stages = parse_stages(args.stages)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.store and (stages != STAGES or args.policy != "full"):
+        parser.error("--store only caches full runs; drop --stages/--policy")
 
     post = args.post
     if post is None:
         post = input("Enter the post to process: ")
 
-    result = process_post(post)
+    if args.store:
+        from .result_store import ResultStore
+
+        with ResultStore(args.store) as store:
+            result = store.process(post)
+    else:
+        result = process_post(post, stages=stages, policy=args.policy)
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
 
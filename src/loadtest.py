@@ -0,0 +1,534 @@
+"""Load-test and memory-profiling harness for the moderation stack.
+
+Drives ``process_post`` directly, the Flask app in-process through its test
+client, or the app over a local socket, with a configurable request mix,
+concurrency and post-size distribution. Latencies and errors are recorded per
+request kind; ``tracemalloc`` snapshots taken every ``snapshot_every``
+requests report memory growth, the top allocation sites and how much the
+pipeline's caches and textX models retain. Reports are JSON so runs can be
+compared between versions (``python -m src.loadtest compare old.json new.json``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import http.client
+import io
+import json
+import platform
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .interface import process_post
+from .moderation import post_validation_cfg
+from .result_store import pipeline_fingerprint
+
+TRANSPORTS = ("direct", "inprocess", "socket")
+
+# request kind -> what one request of that kind does
+REQUEST_KINDS = {
+    "dashboard": "POST / with the full pipeline",
+    "api": "POST /api/moderate with every stage",
+    "api_light": "POST /api/moderate with classification only",
+    "bulk": "POST /bulk with a 10-post CSV",
+}
+
+_VOCAB = (
+    "hello", "world", "great", "post", "today", "idiot", "stupid", "slur1", "friends",
+    "@alice", "@bob", "#news", "#fun", "#daily", "https://example.com/a", "www.example.org",
+    "*bold*", "-italic-", "~flip~", "$x^2$", "42", "😄", "🚀", "hey!", "(really)",
+)
+
+REPORT_VERSION = 1
+
+
+@dataclass
+class LoadConfig:
+    transport: str = "inprocess"
+    requests: int = 10_000
+    concurrency: int = 8
+    mix: Dict[str, float] = field(default_factory=lambda: {"dashboard": 1, "api": 1, "api_light": 2})
+    sizes: str = "lognormal:2.5,0.8"
+    snapshot_every: int = 10_000
+    # unmeasured requests that fill imports and template/grammar caches first
+    warmup: int = 50
+    tracemalloc: bool = True
+    top_allocations: int = 10
+    seed: int = 0
+
+    def __post_init__(self):
+        for name in ("requests", "warmup"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must be >= 0")
+        for name in ("concurrency", "snapshot_every"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be >= 1")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """``"dashboard=1,api_light=3"`` -> ``{"dashboard": 1.0, "api_light": 3.0}``."""
+
+    mix = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Request mix needs at least one positive weight")
+    return mix
+
+
+def size_sampler(spec: str) -> Callable[[random.Random], int]:
+    """Post sizes in words: ``fixed:N``, ``uniform:A-B`` or ``lognormal:MU,SIGMA``."""
+
+    kind, _, args = spec.partition(":")
+    try:
+        if kind == "fixed":
+            n = int(args)
+            return lambda rng: n
+        if kind == "uniform":
+            lo, hi = (int(v) for v in args.split("-"))
+            return lambda rng: rng.randint(lo, hi)
+        if kind == "lognormal":
+            mu, sigma = (float(v) for v in args.split(","))
+            return lambda rng: max(1, min(2000, int(rng.lognormvariate(mu, sigma))))
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid size distribution: {spec}")
+
+
+def make_post(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_VOCAB) for _ in range(words))
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank latency summary in milliseconds."""
+
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        "p50": rank(50),
+        "p90": rank(90),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1] * 1000,
+        "mean": sum(ordered) / len(ordered) * 1000,
+    }
+
+
+# transports -------------------------------------------------------------
+def _bulk_body(rng: random.Random, sampler) -> bytes:
+    lines = ["id,post"] + [f'{i},"{make_post(rng, sampler(rng))}"' for i in range(10)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _Direct:
+    def __init__(self, app=None):
+        pass
+
+    def send(self, kind: str, post: str, rng, sampler) -> int:
+        if kind == "api_light":
+            process_post(post, stages="classification")
+        elif kind == "bulk":
+            for _ in range(10):
+                process_post(make_post(rng, sampler(rng)), stages="classification,transformation")
+        else:
+            process_post(post)
+        return 200
+
+    def close(self) -> None:
+        pass
+
+
+class _InProcess:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client
+
+    def send(self, kind: str, post: str, rng, sampler) -> int:
+        client = self._client()
+        if kind == "dashboard":
+            response = client.post("/", data={"post_text": post})
+        elif kind == "api":
+            response = client.post("/api/moderate", json={"post": post})
+        elif kind == "api_light":
+            response = client.post("/api/moderate", json={"post": post, "stages": ["classification"]})
+        else:
+            response = client.post(
+                "/bulk",
+                data={"file": (io.BytesIO(_bulk_body(rng, sampler)), "load.csv")},
+                content_type="multipart/form-data",
+            )
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    def close(self) -> None:
+        pass
+
+
+class _Socket:
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class _QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self._server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def send(self, kind: str, post: str, rng, sampler) -> int:
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        try:
+            if kind == "dashboard":
+                from urllib.parse import urlencode
+
+                body = urlencode({"post_text": post}).encode("utf-8")
+                headers = {"Content-Type": "application/x-www-form-urlencoded"}
+                path = "/"
+            elif kind in ("api", "api_light"):
+                payload = {"post": post}
+                if kind == "api_light":
+                    payload["stages"] = ["classification"]
+                body = json.dumps(payload).encode("utf-8")
+                headers = {"Content-Type": "application/json"}
+                path = "/api/moderate"
+            else:
+                boundary = "loadtestboundary"
+                body = (
+                    f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"load.csv\"\r\n"
+                    f"Content-Type: text/csv\r\n\r\n"
+                ).encode("utf-8") + _bulk_body(rng, sampler) + f"\r\n--{boundary}--\r\n".encode("utf-8")
+                headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+                path = "/bulk"
+            conn.request("POST", path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_TRANSPORT_CLASSES = {"direct": _Direct, "inprocess": _InProcess, "socket": _Socket}
+
+
+# memory probes ----------------------------------------------------------
+def retention() -> Dict[str, int]:
+    """Sizes of long-lived caches and the number of live textX models."""
+
+    post_cls = post_validation_cfg._mm["Post"]
+    live_models = sum(1 for obj in gc.get_objects() if type(obj) is post_cls)
+    return {
+        "renderers": len(post_validation_cfg._renderers),
+        "live_textx_models": live_models,
+    }
+
+
+class _Gate:
+    """Lets requests run concurrently, or holds them all while a snapshot runs.
+
+    ``gc.collect()`` and ``take_snapshot()`` stall the interpreter; requests
+    timed across one would inflate the percentiles, so :meth:`exclusive`
+    waits for in-flight requests to finish and blocks new ones until done.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = 0
+        self._paused = False
+        self.paused_s = 0.0
+
+    @contextmanager
+    def request(self):
+        with self._cond:
+            while self._paused:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def exclusive(self, fn: Callable[..., None], *args) -> None:
+        with self._cond:
+            while self._paused:
+                self._cond.wait()
+            self._paused = True
+            while self._active:
+                self._cond.wait()
+        started = time.perf_counter()
+        try:
+            fn(*args)
+        finally:
+            with self._cond:
+                self.paused_s += time.perf_counter() - started
+                self._paused = False
+                self._cond.notify_all()
+
+
+class _MemoryTracker:
+    def __init__(self, top: int):
+        self.top = top
+        self.snapshots: List[Dict[str, Any]] = []
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._first: Optional[tracemalloc.Snapshot] = None
+
+    def take(self, requests: int) -> None:
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        entry: Dict[str, Any] = {
+            "requests": requests,
+            "current_kb": current / 1024,
+            "peak_kb": peak / 1024,
+            "retention": retention(),
+        }
+        if self._previous is not None:
+            entry["top_growth"] = self._diff(snapshot, self._previous)
+        else:
+            self._first = snapshot
+        self._previous = snapshot
+        self.snapshots.append(entry)
+
+    def _diff(self, new, old) -> List[Dict[str, Any]]:
+        stats = new.compare_to(old, "lineno")[: self.top]
+        return [
+            {
+                "site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                "size_diff_kb": s.size_diff / 1024,
+                "count_diff": s.count_diff,
+            }
+            for s in stats
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        if len(self.snapshots) < 2:
+            return {"snapshots": self.snapshots}
+        first, last = self.snapshots[0], self.snapshots[-1]
+        span = last["requests"] - first["requests"]
+        growth = (last["current_kb"] - first["current_kb"]) / span * 10_000 if span else 0.0
+        return {
+            "growth_per_10k_kb": growth,
+            # allocation sites that grew most between the first and last snapshot
+            "top_allocations": self._diff(self._previous, self._first),
+            "snapshots": self.snapshots,
+        }
+
+
+# runner -----------------------------------------------------------------
+def run_load(config: LoadConfig, app=None) -> Dict[str, Any]:
+    """Run one load test and return the JSON-serializable report."""
+
+    if config.transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {config.transport}")
+    for kind in config.mix:
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind: {kind}")
+    sampler = size_sampler(config.sizes)
+    if app is None and config.transport != "direct":
+        from .web_interface import app
+    transport = _TRANSPORT_CLASSES[config.transport](app)
+
+    kinds = list(config.mix)
+    weights = [config.mix[k] for k in kinds]
+    latencies: Dict[str, List[float]] = {k: [] for k in kinds}
+    errors: Dict[str, int] = {k: 0 for k in kinds}
+    error_samples: List[str] = []
+    lock = threading.Lock()
+    gate = _Gate()
+    done = [0]
+    tracker = _MemoryTracker(config.top_allocations) if config.tracemalloc else None
+
+    def one(index: int) -> None:
+        rng = random.Random(config.seed * 1_000_003 + index)
+        kind = rng.choices(kinds, weights)[0]
+        post = make_post(rng, sampler(rng))
+        with gate.request():
+            started = time.perf_counter()
+            try:
+                status = transport.send(kind, post, rng, sampler)
+                error = None if status == 200 else f"HTTP {status}"
+            except Exception as exc:  # report, don't abort the run
+                error = f"{type(exc).__name__}: {exc}"
+            elapsed = time.perf_counter() - started
+        with lock:
+            latencies[kind].append(elapsed)
+            if error is not None:
+                errors[kind] += 1
+                if len(error_samples) < 10:
+                    error_samples.append(error)
+            done[0] += 1
+            count = done[0]
+        if tracker is not None and count % config.snapshot_every == 0:
+            # no request is timed while the snapshot runs
+            gate.exclusive(tracker.take, count)
+
+    warm = random.Random(config.seed - 1)
+    for i in range(config.warmup):
+        try:
+            transport.send(kinds[i % len(kinds)], make_post(warm, sampler(warm)), warm, sampler)
+        except Exception:
+            pass  # failures show up in the measured run
+
+    if tracker is not None:
+        tracemalloc.start()
+        tracker.take(0)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=config.concurrency) as pool:
+            list(pool.map(one, range(config.requests)))
+    finally:
+        # snapshot pauses are excluded from the measured duration
+        duration = time.perf_counter() - started - gate.paused_s
+        transport.close()
+        if tracker is not None:
+            if not tracker.snapshots or tracker.snapshots[-1]["requests"] != done[0]:
+                tracker.take(done[0])
+            tracemalloc.stop()
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    total_errors = sum(errors.values())
+    return {
+        "report_version": REPORT_VERSION,
+        "version": {
+            "pipeline_fingerprint": pipeline_fingerprint(),
+            "python": platform.python_version(),
+        },
+        "config": asdict(config),
+        "summary": {
+            "requests": len(all_latencies),
+            "errors": total_errors,
+            "error_rate": total_errors / len(all_latencies) if all_latencies else 0.0,
+            "duration_s": duration,
+            "snapshot_pause_s": gate.paused_s,
+            "throughput_rps": len(all_latencies) / duration if duration > 0 else 0.0,
+            "latency_ms": percentiles(all_latencies),
+            "error_samples": error_samples,
+        },
+        "by_kind": {
+            kind: {
+                "requests": len(latencies[kind]),
+                "errors": errors[kind],
+                "latency_ms": percentiles(latencies[kind]),
+            }
+            for kind in kinds
+        },
+        "memory": tracker.summary() if tracker is not None else None,
+        "retention": retention(),
+    }
+
+
+def compare_reports(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Headline deltas (new - old) between two reports."""
+
+    def metric(report, *path):
+        value = report
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+    rows = {
+        "throughput_rps": ("summary", "throughput_rps"),
+        "error_rate": ("summary", "error_rate"),
+        "latency_p50_ms": ("summary", "latency_ms", "p50"),
+        "latency_p99_ms": ("summary", "latency_ms", "p99"),
+        "growth_per_10k_kb": ("memory", "growth_per_10k_kb"),
+    }
+    out = {}
+    for name, path in rows.items():
+        a, b = metric(old, *path), metric(new, *path)
+        out[name] = {"old": a, "new": b, "delta": (b - a) if a is not None and b is not None else None}
+    out["same_pipeline"] = metric(old, "version", "pipeline_fingerprint") == metric(new, "version", "pipeline_fingerprint")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Moderation load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run")
+    run.add_argument("--transport", choices=TRANSPORTS, default="inprocess")
+    run.add_argument("--requests", type=int, default=10_000)
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--mix", default="dashboard=1,api=1,api_light=2",
+                     help=f"Weighted request kinds ({', '.join(REQUEST_KINDS)}).")
+    run.add_argument("--sizes", default="lognormal:2.5,0.8",
+                     help="Words per post: fixed:N, uniform:A-B or lognormal:MU,SIGMA.")
+    run.add_argument("--snapshot-every", type=int, default=10_000)
+    run.add_argument("--warmup", type=int, default=50)
+    run.add_argument("--no-tracemalloc", action="store_true")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", help="Write the JSON report to this file.")
+
+    cmp = sub.add_parser("compare")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as a, open(args.new, encoding="utf-8") as b:
+            print(json.dumps(compare_reports(json.load(a), json.load(b)), indent=2))
+        return
+
+    try:
+        config = LoadConfig(
+            transport=args.transport,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            mix=parse_mix(args.mix),
+            sizes=args.sizes,
+            snapshot_every=args.snapshot_every,
+            warmup=args.warmup,
+            tracemalloc=not args.no_tracemalloc,
+            seed=args.seed,
+        )
+        size_sampler(config.sizes)
+    except ValueError as exc:
+        parser.error(str(exc))
+    report = run_load(config)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        print(json.dumps(report["summary"], indent=2))
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,15 @@
 from __future__ import annotations
 import json
 import re
+import uuid
 from dataclasses import dataclass, asdict
 from typing import Iterable, Dict, Tuple
 
+try:
+    from .regexRules import token_kind
+except ImportError:  # run as a script from this directory
+    from regexRules import token_kind
+
 # 0) Keyword lists
 HATE_KEYWORDS = {"slur1", "slur2"}          # classroom placeholders
 OFFENSIVE_KEYWORDS = {"stupid", "idiot"}    # simple examples
@@ -13,6 +19,28 @@ OFFENSIVE_KEYWORDS = {"stupid", "idiot"}    # simple examples
 MAX_LINKS_FOR_SAFE = 1       # 2+ links => spam
 MAX_HASHTAGS_FOR_SAFE = 2    # 3+ hashtags => spam
 
+# Process-wide tables used when classify()/categorize() are not given any,
+# e.g. the shared-memory tables installed by shared_tables.init_worker
+_active_lexicon = None
+_active_dfas = None
+_active_digest = None
+
+def use_tables(lexicon=None, dfas=None, digest=None):
+    # lexicon: (hate, offensive) keyword collections, dfas: (hate, offensive,
+    # spam) automata; None restores the module definitions. digest names the
+    # tables for result caches; without one a random digest is used, so
+    # cached results are never shared with other tables
+    global _active_lexicon, _active_dfas, _active_digest
+    _active_lexicon = tuple(lexicon) if lexicon is not None else None
+    _active_dfas = tuple(dfas) if dfas is not None else None
+    if _active_lexicon is None and _active_dfas is None:
+        _active_digest = None
+    else:
+        _active_digest = digest or uuid.uuid4().hex
+
+def active_tables_digest():
+    return _active_digest
+
 # 1)  partner preprocessing (regexRules.py)
 def _try_partner_preprocess(text: str):
     try:
@@ -43,9 +71,11 @@ def _fallback_extract_all(text: str):
     mentions = _MENTION_RE.findall(normalized)
     emojis = _EMOJI_RE.findall(normalized)
     tokens = normalized.split()
+    kinds = [token_kind(t) for t in tokens]
     return {
         "mentions": mentions, "hashtags": hashtags, "urls": urls,
-        "emojis": emojis, "tokens": tokens, "normalized": normalized
+        "emojis": emojis, "tokens": tokens, "kinds": kinds,
+        "normalized": normalized
     }
 
 def preprocess(text: str):
@@ -59,20 +89,34 @@ def preprocess(text: str):
     return _fallback_extract_all(text)
 
 # 2) Map tokens into a small alphabet
-def categorize(token: str) -> str:
-    # URLs and hashtags first 
+def categorize(token: str, hate_keywords=None, offensive_keywords=None, kind=None) -> str:
+    # keyword collections only need ``in``; default to the active tables,
+    # then the module lists
+    active_hate, active_offensive = _active_lexicon or (HATE_KEYWORDS, OFFENSIVE_KEYWORDS)
+    if hate_keywords is None:
+        hate_keywords = active_hate
+    if offensive_keywords is None:
+        offensive_keywords = active_offensive
+
+    # URLs and hashtags first: typed tokens (see regexRules.token_kind)
+    # carry their type, untyped ones are recognised by prefix
     lowered = token.lower()
-    if lowered.startswith("http") or lowered.startswith("www."):
+    if kind is not None:
+        if kind == "URL":
+            return "LINK"
+        if kind == "HASHTAG":
+            return "HASHTAG"
+    elif lowered.startswith("http") or lowered.startswith("www."):
         return "LINK"
-    if lowered.startswith("#"):
+    elif lowered.startswith("#"):
         return "HASHTAG"
 
     # for example if gets: "idiot!" -> "idiot", "(stupid)" -> "stupid"
     core = re.sub(r"^[^\w]+|[^\w]+$", "", lowered)
 
-    if core in HATE_KEYWORDS:
+    if core in hate_keywords:
         return "HATE"
-    if core in OFFENSIVE_KEYWORDS:
+    if core in offensive_keywords:
         return "OFFENSIVE"
     return "OTHER"
 
@@ -148,13 +192,19 @@ class ClassificationReport:
     spam: bool
     details: dict
 
-def classify(text: str) -> ClassificationReport:
+def classify(text: str, lexicon=None, dfas=None) -> ClassificationReport:
+    # lexicon: (hate, offensive) keyword collections, dfas: (hate, offensive, spam)
+    # automata with a ``run`` method; both default to use_tables(), then the
+    # module definitions
+    hate_keywords, offensive_keywords = lexicon or (None, None)
+    hate_dfa, off_dfa, spam_dfa = dfas or _active_dfas or (build_hate_dfa(), build_offensive_dfa(), build_spam_dfa())
     data = preprocess(text)
     tokens = data["tokens"]
-    symbols = [categorize(t) for t in tokens]
-    is_hate = build_hate_dfa().run(symbols)
-    is_off = build_offensive_dfa().run(symbols)
-    is_spam = build_spam_dfa().run(symbols)
+    kinds = data.get("kinds") or [None] * len(tokens)
+    symbols = [categorize(t, hate_keywords, offensive_keywords, k) for t, k in zip(tokens, kinds)]
+    is_hate = hate_dfa.run(symbols)
+    is_off = off_dfa.run(symbols)
+    is_spam = spam_dfa.run(symbols)
     details = {
         "tokens": tokens,
         "symbols": symbols,
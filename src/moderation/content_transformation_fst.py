@@ -5,7 +5,12 @@ from dataclasses import dataclass, asdict
 from typing import List
 
 try:
-    from moderation.content_classification_dfa import classify, categorize, HATE_KEYWORDS, OFFENSIVE_KEYWORDS
+    # the package-relative import shares the classifier (and any tables
+    # installed with use_tables) with src.interface
+    try:
+        from .content_classification_dfa import classify, categorize, HATE_KEYWORDS, OFFENSIVE_KEYWORDS
+    except ImportError:
+        from moderation.content_classification_dfa import classify, categorize, HATE_KEYWORDS, OFFENSIVE_KEYWORDS
     _HAVE_CLASSIFIER = True
 except Exception:
     _HAVE_CLASSIFIER = False
@@ -32,9 +37,10 @@ class TransformResult:
     categories: List[str]
     original_tokens: List[str]
 
-def transform(post: str) -> TransformResult:
-    if _HAVE_CLASSIFIER:
-        rep = classify(post)
+def transform(post: str, report=None) -> TransformResult:
+    # report: an already computed ClassificationReport for ``post``
+    if report is not None or _HAVE_CLASSIFIER:
+        rep = report if report is not None else classify(post)
         raw_tokens = rep.details["tokens"]
         tokens = [t.lower() for t in raw_tokens]
         symbols = rep.details["symbols"]
@@ -1,6 +1,7 @@
-from collections.abc import Iterable
 from html import escape as html_escape
-from typing import Tuple, Any
+from io import StringIO
+from time import perf_counter
+from typing import Tuple, Any, Dict, List, Optional
 from textx import metamodel_from_str, TextXSyntaxError
 
 GRAMMAR = r'''
@@ -78,61 +79,225 @@ _flip_map = str.maketrans(
     "ɐqɔpǝɟƃɥᴉɾʞʅɯuodbɹsʇnʌʍxʎz∀qƆpƎℲפHΙſʞ⅂WNOԀΌᴚS⊥∩ΛMXʎZ⇂ᘔƐㄣϛ9ㄥ860"
 )
 
-def _render_inline(inline_parts) -> str:
-    if hasattr(inline_parts, 'parts'):
-        inline_parts = inline_parts.parts
-
-    if inline_parts is None:
-        inline_parts = []
-    elif isinstance(inline_parts, (str, bytes)):
-        inline_parts = [inline_parts]
-    elif not isinstance(inline_parts, Iterable):
-        inline_parts = [inline_parts]
-
-    out = []
-    for p in inline_parts:
-        name = p.__class__.__name__
-        if name in {'Word', 'Number', 'Emoji', 'Mention'}:
-            out.append(p.token)
-        else:
-            out.append(str(p))
-    return ''.join(out)
-
-def render_preview(model) -> str:
-    rendered = []
-    for part in model.text.parts:
-        name = part.__class__.__name__
-        if name in {'Word', 'Number'}:
-            rendered.append(part.token)
-        elif name == 'Emoji':
-            rendered.append(part.token)
-        elif name == 'Mention':
-            rendered.append(part.token)
-        elif name == 'Italic':
-            rendered.append(f"*{_render_inline(part.content)}*")
-        elif name == 'Bold':
-            rendered.append(f"**{_render_inline(part.content)}**")
-        elif name == 'Underline':
-            rendered.append(f"<u>{_render_inline(part.content)}</u>")
-        elif name == 'AltFont':
-            rendered.append(f"<span style='font-family:monospace'>{_render_inline(part.content)}</span>")
-        elif name == 'UpsideDown':
-            txt = _render_inline(part.content)
-            rendered.append(txt.translate(_flip_map)[::-1])
-        elif name == 'Formula':
-            rendered.append(f"$ {html_escape(part.expr)} $")
-        else:
-            rendered.append(str(part))
-
-    if getattr(model, 'hashtag_list', None):
-        rendered.append("\n\n**Hashtags:** ")
-        rendered.append(' '.join(h.token for h in model.hashtag_list.hashtags))
-
-    if getattr(model, 'link_list', None):
-        rendered.append("\n\n**Links:** ")
-        rendered.append(' '.join(l.token for l in model.link_list.links))
-
-    return ''.join(rendered)
+# Output targets: wrappers per enhancement and the trailing list headings.
+# "markdown" is the historical preview format (Markdown with inline HTML).
+# Optional keys: "escape" (HTML-escape tokens), "escape_formula" (defaults to
+# "escape") and "separator" (written between text parts, default "").
+_WRAPPERS = ("Italic", "Bold", "Underline", "AltFont", "Formula", "Hashtags", "Links")
+
+_TARGETS = {
+    "markdown": {
+        "escape": False,
+        "escape_formula": True,
+        "Italic": ("*", "*"),
+        "Bold": ("**", "**"),
+        "Underline": ("<u>", "</u>"),
+        "AltFont": ("<span style='font-family:monospace'>", "</span>"),
+        "Formula": ("$ ", " $"),
+        "Hashtags": ("\n\n**Hashtags:** ", ""),
+        "Links": ("\n\n**Links:** ", ""),
+    },
+    "html": {
+        "escape": True,
+        "Italic": ("<em>", "</em>"),
+        "Bold": ("<strong>", "</strong>"),
+        "Underline": ("<u>", "</u>"),
+        "AltFont": ("<span style='font-family:monospace'>", "</span>"),
+        "Formula": ("<code>$ ", " $</code>"),
+        "Hashtags": ("<p><strong>Hashtags:</strong> ", "</p>"),
+        "Links": ("<p><strong>Links:</strong> ", "</p>"),
+    },
+    "text": {
+        "escape": False,
+        "separator": " ",
+        "Italic": ("", ""),
+        "Bold": ("", ""),
+        "Underline": ("", ""),
+        "AltFont": ("", ""),
+        "Formula": ("$ ", " $"),
+        "Hashtags": ("\n\nHashtags: ", ""),
+        "Links": ("\n\nLinks: ", ""),
+    },
+}
+
+
+def _check_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    missing = [key for key in _WRAPPERS if key not in spec]
+    if missing:
+        raise ValueError(f"Render target spec is missing: {', '.join(missing)}")
+    checked = dict(spec)
+    for key in _WRAPPERS:
+        pair = tuple(spec[key])
+        if len(pair) != 2 or not all(isinstance(s, str) for s in pair):
+            raise ValueError(f"Render target {key!r} must be a (before, after) pair of strings")
+        checked[key] = pair
+    checked["escape"] = bool(spec.get("escape", False))
+    checked["escape_formula"] = bool(spec.get("escape_formula", checked["escape"]))
+    checked["separator"] = str(spec.get("separator", ""))
+    return checked
+
+
+for _name, _spec in _TARGETS.items():
+    _TARGETS[_name] = _check_spec(_spec)
+
+
+def register_target(name: str, spec: Dict[str, Any], replace: bool = False) -> None:
+    """Add output target ``name`` (see ``_TARGETS`` for the spec keys)."""
+
+    if name in _TARGETS and not replace:
+        raise ValueError(f"Render target already registered: {name}")
+    _TARGETS[name] = _check_spec(spec)
+    _renderers.pop(name, None)
+
+
+def available_targets() -> Tuple[str, ...]:
+    return tuple(_TARGETS)
+
+
+class RenderTimings:
+    """Accumulates render time per metamodel class across calls."""
+
+    def __init__(self):
+        self.counts = {}
+        self.seconds = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """``{class: {count, total, mean}}``, slowest total first."""
+
+        order = sorted(self.seconds, key=self.seconds.get, reverse=True)
+        return {
+            name: {
+                "count": self.counts[name],
+                "total": self.seconds[name],
+                "mean": self.seconds[name] / self.counts[name],
+            }
+            for name in order
+        }
+
+
+class Renderer:
+    """Preview renderer for one target, dispatching on metamodel classes.
+
+    The dispatch table maps each textX class of ``metamodel`` to a bound
+    handler once, so rendering a part is a single dict lookup; handlers
+    write straight into the caller's output buffer.
+    """
+
+    def __init__(self, target: str = "markdown", metamodel=None, spec: Optional[Dict[str, Any]] = None):
+        # ``spec`` renders with an unregistered target; ``target`` then only names it
+        if spec is None and target not in _TARGETS:
+            raise ValueError(f"Unknown render target: {target}")
+        mm = metamodel or _mm
+        self.target = target
+        self._spec = _check_spec(spec) if spec is not None else _TARGETS[target]
+        self._escape = html_escape if self._spec["escape"] else str
+        self._separator = self._spec["separator"]
+        self._token_classes = tuple(mm[name] for name in ("Word", "Number", "Emoji", "Mention"))
+        self._dispatch = {cls: self._token for cls in self._token_classes}
+        for name in ("Italic", "Bold", "Underline", "AltFont"):
+            self._dispatch[mm[name]] = self._wrapper(*self._spec[name])
+        self._dispatch[mm["UpsideDown"]] = self._upside_down
+        self._dispatch[mm["Formula"]] = self._formula
+
+    # handlers -----------------------------------------------------------
+    def _token(self, part, write) -> None:
+        write(self._escape(part.token))
+
+    def _wrapper(self, before: str, after: str):
+        # ``content`` is a single Word/Number/Emoji/Mention (see ``Inline``)
+        def handler(part, write):
+            write(before)
+            write(self._escape(part.content.token))
+            write(after)
+        return handler
+
+    def _upside_down(self, part, write) -> None:
+        # flip the raw text first so escaping never gets reversed
+        write(self._escape(part.content.token.translate(_flip_map)[::-1]))
+
+    def _formula(self, part, write) -> None:
+        before, after = self._spec["Formula"]
+        write(before)
+        write(html_escape(part.expr) if self._spec["escape_formula"] else part.expr)
+        write(after)
+
+    # entry points -------------------------------------------------------
+    def render_into(self, model, write, timings: Optional[RenderTimings] = None) -> None:
+        dispatch = self._dispatch
+        separator = self._separator
+        for i, part in enumerate(model.text.parts):
+            if i and separator:
+                write(separator)
+            handler = dispatch.get(type(part))
+            if timings is None:
+                if handler is None:
+                    write(str(part))
+                else:
+                    handler(part, write)
+                continue
+            started = perf_counter()
+            if handler is None:
+                write(str(part))
+            else:
+                handler(part, write)
+            timings.add(type(part).__name__, perf_counter() - started)
+
+        for attr, items, key in (("hashtag_list", "hashtags", "Hashtags"), ("link_list", "links", "Links")):
+            section = getattr(model, attr, None)
+            if not section:
+                continue
+            started = perf_counter() if timings is not None else 0.0
+            before, after = self._spec[key]
+            write(before)
+            write(' '.join(self._escape(item.token) for item in getattr(section, items)))
+            write(after)
+            if timings is not None:
+                timings.add(type(section).__name__, perf_counter() - started)
+
+    def render(self, model, timings: Optional[RenderTimings] = None) -> str:
+        out = StringIO()
+        self.render_into(model, out.write, timings)
+        return out.getvalue()
+
+    def render_many(self, models, timings: Optional[RenderTimings] = None) -> List[str]:
+        """Render ``models`` into one shared buffer and split it once at the end."""
+
+        out = StringIO()
+        written = 0
+
+        def write(s: str) -> None:
+            nonlocal written
+            written += len(s)
+            out.write(s)
+
+        bounds = [0]
+        for model in models:
+            self.render_into(model, write, timings)
+            bounds.append(written)
+        text = out.getvalue()
+        return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+_renderers: Dict[str, Renderer] = {}
+
+
+def get_renderer(target: str = "markdown") -> Renderer:
+    renderer = _renderers.get(target)
+    if renderer is None:
+        renderer = _renderers[target] = Renderer(target)
+    return renderer
+
+
+def render_preview(model, target: str = "markdown", timings: Optional[RenderTimings] = None) -> str:
+    return get_renderer(target).render(model, timings)
+
+
+def render_many(models, target: str = "markdown", timings: Optional[RenderTimings] = None) -> List[str]:
+    return get_renderer(target).render_many(models, timings)
 
 if __name__ == "__main__":
     txt = "Hi -italic- *bold* _under_ $a^2+b^2=c^2$ @alice #math https://test.com"
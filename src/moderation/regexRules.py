@@ -51,13 +51,33 @@ def tokenize(text):
                 break
     return tokens
 
+# TOKEN_RE group number -> token type; "www." runs are links like in the
+# classifier's prefix check
+TOKEN_TYPES = {1: "URL", 2: "MENTION", 3: "HASHTAG", 4: "EMOJI", 5: "WORD"}
+
+def _kind(m):
+    kind = TOKEN_TYPES[m.lastindex]
+    if kind == "WORD" and m.group().lower().startswith("www."):
+        kind = "URL"
+    return kind
+
+def tokenize_typed(text):
+    return [(m.group(), _kind(m)) for m in TOKEN_RE.finditer(text)]
+
+def token_kind(token):
+    # type of the leading lexeme of a whitespace-separated token:
+    # "#tag-x" is a HASHTAG, "httpfoo" a WORD
+    m = TOKEN_RE.match(token)
+    return _kind(m) if m else "WORD"
+
 def extract_all(text):
-    
+    typed = tokenize_typed(text)
     return {
         "mentions": extract_mentions(text),
         "hashtags": extract_hashtags(text),
         "urls": extract_urls(text),
         "emojis": extract_emojis(text),
-        "tokens": tokenize(text),
+        "tokens": [tok for tok, _ in typed],
+        "kinds": [kind for _, kind in typed],
         "normalized": normalize_text(text),
     }
\ No newline at end of file
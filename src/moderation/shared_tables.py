@@ -0,0 +1,471 @@
+"""Shared-memory lexicon and DFA tables for multi-process deployments.
+
+Every worker of a process pool or a pre-forking WSGI server normally keeps its
+own copy of the keyword sets and automata.  :class:`SharedTables` compiles them
+once into a flat, read-only byte layout stored in a
+:mod:`multiprocessing.shared_memory` segment; workers attach to the segment by
+name and read it in place without copying.
+
+Layout (little endian)::
+
+    magic "MDTB" | u32 version | u32 index length | JSON index | sections
+
+Lexicon sections are an open-addressing hash table of ``slots`` u32 entries
+(keyword number + 1, 0 for empty; probed linearly from ``crc32(word) %
+slots``), ``count + 1`` u32 offsets and the UTF-8 encoded keywords.  A lookup
+hashes the key and compares it with the stored bytes in place.  DFA sections
+are ``states * symbols`` u8 transition tables indexed by
+``state * len(symbols) + symbol``.  Sections start 4-byte aligned.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+import zlib
+from multiprocessing import get_context, resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from . import content_classification_dfa as _dfa
+
+MAGIC = b"MDTB"
+FORMAT_VERSION = 2
+SYMBOLS = ("HATE", "OFFENSIVE", "LINK", "HASHTAG", "OTHER")
+
+_HEADER = struct.Struct("<4sII")
+_U32 = struct.Struct("<I")
+
+
+def _compile_lexicon(words: Iterable[str]):
+    encoded = sorted({w.encode("utf-8") for w in words})
+    slots = 1
+    while slots < 2 * len(encoded):  # load factor <= 1/2
+        slots *= 2
+    table = [0] * slots
+    offsets = [0]
+    for number, word in enumerate(encoded, start=1):
+        offsets.append(offsets[-1] + len(word))
+        slot = zlib.crc32(word) & (slots - 1)
+        while table[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = number
+    data = b"".join(encoded)
+    data += b"\0" * (-len(data) % 4)
+    blob = struct.pack(f"<{slots}I", *table) + struct.pack(f"<{len(offsets)}I", *offsets) + data
+    return blob, len(encoded), slots
+
+
+def _u32_array(buf, offset: int, count: int):
+    # zero-copy view where the native layout matches, else a private copy
+    if sys.byteorder == "little" and struct.calcsize("I") == 4:
+        return buf[offset:offset + count * 4].cast("I")
+    return struct.unpack_from(f"<{count}I", buf, offset)
+
+
+def _compile_dfa(dfa) -> Dict:
+    # resolve (state, symbol) exactly like DFA.run: explicit edge, then
+    # __ELSE__, then stay put
+    states = sorted(dfa.states)
+    if len(states) > 255:
+        raise ValueError("shared DFA tables support at most 255 states")
+    index = {s: i for i, s in enumerate(states)}
+    table = bytearray()
+    for s in states:
+        for sym in SYMBOLS:
+            nxt = dfa.delta.get((s, sym), dfa.delta.get((s, "__ELSE__"), s))
+            table.append(index[nxt])
+    return {
+        "states": len(states),
+        "start": index[dfa.start],
+        "accept": sorted(index[s] for s in dfa.accept),
+        "table": bytes(table),
+    }
+
+
+def compile_tables(hate_keywords=None, offensive_keywords=None, dfas=None) -> bytes:
+    """Serialize the lexicon and DFAs into the shared byte layout.
+
+    Keyword lists default to the classifier's module lists and ``dfas`` to a
+    ``{"hate": ..., "offensive": ..., "spam": ...}`` mapping built from the
+    classifier's ``build_*_dfa`` functions.
+    """
+
+    if hate_keywords is None:
+        hate_keywords = _dfa.HATE_KEYWORDS
+    if offensive_keywords is None:
+        offensive_keywords = _dfa.OFFENSIVE_KEYWORDS
+    if dfas is None:
+        dfas = {
+            "hate": _dfa.build_hate_dfa(),
+            "offensive": _dfa.build_offensive_dfa(),
+            "spam": _dfa.build_spam_dfa(),
+        }
+
+    sections: List[bytes] = []
+    index: Dict = {"symbols": list(SYMBOLS), "lexicon": {}, "dfas": {}}
+    offset = 0
+
+    for category, words in (("HATE", hate_keywords), ("OFFENSIVE", offensive_keywords)):
+        blob, count, slots = _compile_lexicon(words)
+        index["lexicon"][category] = {"offset": offset, "count": count, "slots": slots}
+        sections.append(blob)
+        offset += len(blob)
+
+    for name, dfa in dfas.items():
+        compiled = _compile_dfa(dfa)
+        table = compiled.pop("table")
+        index["dfas"][name] = dict(compiled, offset=offset)
+        sections.append(table)
+        offset += len(table)
+
+    raw_index = json.dumps(index, sort_keys=True).encode("utf-8")
+    raw_index += b" " * (-(_HEADER.size + len(raw_index)) % 4)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(raw_index))
+    return header + raw_index + b"".join(sections)
+
+
+class SharedLexicon:
+    """Read-only keyword set backed by a shared buffer (supports ``in``)."""
+
+    def __init__(self, buf, offset: int, count: int, slots: int):
+        self._buf = buf
+        self._count = count
+        self._mask = slots - 1
+        self._slots = _u32_array(buf, offset, slots)
+        self._offsets = _u32_array(buf, offset + slots * 4, count + 1)
+        self._data = offset + (slots + count + 1) * 4
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, word) -> bool:
+        if not isinstance(word, str):
+            return False
+        key = word.encode("utf-8")
+        size = len(key)
+        table, offsets, buf, data, mask = self._slots, self._offsets, self._buf, self._data, self._mask
+        slot = zlib.crc32(key) & mask
+        while True:
+            number = table[slot]
+            if not number:
+                return False
+            start = offsets[number - 1]
+            if offsets[number] - start == size and buf[data + start:data + start + size] == key:
+                return True
+            slot = (slot + 1) & mask
+
+    def release(self) -> None:
+        for view in (self._slots, self._offsets):
+            if isinstance(view, memoryview):
+                view.release()
+
+
+class SharedDFA:
+    """Transition table view with the same ``run`` interface as ``DFA``."""
+
+    def __init__(self, buf, offset: int, states: int, start: int, accept: Sequence[int]):
+        self._buf = buf
+        self._offset = offset
+        self.states = states
+        self.start = start
+        self.accept = frozenset(accept)
+        self._symbols = {sym: i for i, sym in enumerate(SYMBOLS)}
+        self._other = self._symbols["OTHER"]
+
+    def run(self, symbols) -> bool:
+        width = len(self._symbols)
+        s = self.start
+        for a in symbols:
+            s = self._buf[self._offset + s * width + self._symbols.get(a, self._other)]
+        return s in self.accept
+
+
+_TRACKER_LOCK = threading.Lock()
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """Open an existing segment without registering it for cleanup.
+
+    Before Python 3.13 every ``SharedMemory`` handle registers the segment
+    with the process's resource tracker, which unlinks it when that process
+    exits - so an unrelated process that attaches would delete the creator's
+    segment on exit.  Only the creator should own cleanup.
+    """
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    with _TRACKER_LOCK:
+        register = resource_tracker.register
+
+        def skip_segment(rname, rtype):
+            if not (rtype == "shared_memory" and rname.lstrip("/") == name.lstrip("/")):
+                register(rname, rtype)
+
+        resource_tracker.register = skip_segment
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedTables:
+    """Lifecycle manager for a shared table segment.
+
+    Use :meth:`create` once in the parent process and :meth:`attach` in each
+    worker.  Every handle must be closed; the creator additionally unlinks the
+    segment (``with`` blocks do both automatically).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self._shm = shm
+        self.owner = owner
+        self._digest: Optional[str] = None
+        buf = shm.buf
+        magic, version, index_len = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            shm.close()
+            raise ValueError(f"segment {shm.name!r} does not hold moderation tables")
+        start = _HEADER.size
+        index = json.loads(bytes(buf[start:start + index_len]))
+        if tuple(index["symbols"]) != SYMBOLS:
+            shm.close()
+            raise ValueError(f"segment {shm.name!r} uses an unknown symbol alphabet")
+        base = start + index_len
+
+        self.lexicons = {
+            cat: SharedLexicon(buf, base + meta["offset"], meta["count"], meta["slots"])
+            for cat, meta in index["lexicon"].items()
+        }
+        self.dfas = {
+            name: SharedDFA(buf, base + meta["offset"], meta["states"], meta["start"], meta["accept"])
+            for name, meta in index["dfas"].items()
+        }
+
+    @classmethod
+    def create(cls, name: Optional[str] = None, **tables) -> "SharedTables":
+        """Compile the tables (see :func:`compile_tables`) into a new segment."""
+
+        blob = compile_tables(**tables)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(blob))
+        shm.buf[:len(blob)] = blob
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedTables":
+        """Attach to an existing segment; raises ``FileNotFoundError`` if gone.
+
+        Attached handles never unlink the segment, even when the attaching
+        process was not started by the creator.
+        """
+
+        return cls(_attach_untracked(name))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def size(self) -> int:
+        return self._shm.size
+
+    def categorize(self, token: str) -> str:
+        return _dfa.categorize(token, self.lexicons["HATE"], self.lexicons["OFFENSIVE"])
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the segment contents, computed once per handle."""
+
+        if self._digest is None:
+            self._digest = hashlib.sha256(self._shm.buf).hexdigest()
+        return self._digest
+
+    @property
+    def lexicon(self):
+        return self.lexicons["HATE"], self.lexicons["OFFENSIVE"]
+
+    @property
+    def automata(self):
+        return self.dfas["hate"], self.dfas["offensive"], self.dfas["spam"]
+
+    def classify(self, text: str) -> "_dfa.ClassificationReport":
+        return _dfa.classify(text, lexicon=self.lexicon, dfas=self.automata)
+
+    def close(self) -> None:
+        # release the views first so the mmap has no exported buffers left
+        for lexicon in self.lexicons.values():
+            lexicon.release()
+        self.lexicons = {}
+        self.dfas = {}
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedTables":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+        if self.owner:
+            self.unlink()
+
+
+# Pool helpers: ``Pool(initializer=init_worker, initargs=(tables.name,))``
+_worker_tables: Optional[SharedTables] = None
+
+
+def init_worker(name: str) -> None:
+    """Attach to ``name`` and make it the classifier's default tables.
+
+    Afterwards ``classify``, ``transform`` and ``process_post`` in this
+    process read the shared segment instead of the module keyword lists.
+    """
+
+    global _worker_tables
+    close_worker()
+    _worker_tables = SharedTables.attach(name)
+    _dfa.use_tables(_worker_tables.lexicon, _worker_tables.automata, _worker_tables.digest)
+
+
+def close_worker() -> None:
+    """Undo :func:`init_worker`: restore the module tables and detach."""
+
+    global _worker_tables
+    if _worker_tables is not None:
+        _dfa.use_tables(None, None)
+        _worker_tables.close()
+        _worker_tables = None
+
+
+def worker_classify(text: str) -> dict:
+    if _worker_tables is None:
+        raise RuntimeError("init_worker() has not been called in this process")
+    return _worker_tables.classify(text).__dict__
+
+
+# Memory benchmark
+_SAMPLE_POSTS = (
+    "hello world",
+    "you are an idiot",
+    "go http://a.com http://b.com #wow",
+    "#a #b #c hello",
+)
+
+
+def _memory_kb() -> Dict[str, int]:
+    wanted = {"VmRSS": "rss_kb", "RssAnon": "private_kb", "RssShmem": "shared_kb"}
+    usage: Dict[str, int] = {}
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                key, _, value = line.partition(":")
+                if key in wanted:
+                    usage[wanted[key]] = int(value.split()[0])
+    except OSError:
+        import resource
+
+        usage["rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def _synthetic_lexicon(size: int) -> List[str]:
+    return [f"kw{i:08d}" for i in range(size)]
+
+
+def _bench_worker(mode: str, arg, ready, results) -> None:
+    if mode == "shared":
+        tables = SharedTables.attach(arg)
+        classifier = tables.classify
+    else:
+        # today's behaviour: each process owns its keyword sets and automata
+        lexicon = (set(_synthetic_lexicon(arg)), set(_dfa.OFFENSIVE_KEYWORDS))
+        dfas = (_dfa.build_hate_dfa(), _dfa.build_offensive_dfa(), _dfa.build_spam_dfa())
+        classifier = lambda text: _dfa.classify(text, lexicon=lexicon, dfas=dfas)
+    for post in _SAMPLE_POSTS:
+        classifier(post)
+    usage = _memory_kb()
+    usage["pid"] = os.getpid()
+    results.put(usage)
+    # stay alive until every worker has reported so all copies coexist
+    ready.wait()
+    if mode == "shared":
+        tables.close()
+
+
+def _run_workers(mode: str, arg, count: int) -> List[Dict[str, int]]:
+    ctx = get_context("spawn")
+    ready = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_bench_worker, args=(mode, arg, ready, results)) for _ in range(count)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    ready.set()
+    for p in procs:
+        p.join()
+    return samples
+
+
+def _summarize(samples: List[Dict[str, int]]) -> Dict[str, float]:
+    keys = sorted({k for s in samples for k in s if k != "pid"})
+    summary = {f"mean_{k}": sum(s.get(k, 0) for s in samples) / len(samples) for k in keys}
+    summary["total_private_kb"] = sum(s.get("private_kb", s.get("rss_kb", 0)) for s in samples)
+    return summary
+
+
+def benchmark_memory(worker_counts: Sequence[int] = (1, 4, 16), lexicon_size: int = 200_000) -> Dict:
+    """Compare per-worker RSS of per-process copies against shared tables.
+
+    A synthetic hate lexicon of ``lexicon_size`` entries stands in for a
+    production-size keyword list.
+    """
+
+    report: Dict = {"lexicon_size": lexicon_size, "copies": {}, "shared": {}}
+    words = _synthetic_lexicon(lexicon_size)
+    with SharedTables.create(hate_keywords=words) as tables:
+        report["segment_kb"] = tables.size // 1024
+        for count in worker_counts:
+            started = time.perf_counter()
+            report["copies"][count] = _summarize(_run_workers("copies", lexicon_size, count))
+            report["copies"][count]["seconds"] = round(time.perf_counter() - started, 3)
+            started = time.perf_counter()
+            report["shared"][count] = _summarize(_run_workers("shared", tables.name, count))
+            report["shared"][count]["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def hold(name: str) -> None:
+    """Create segment ``name`` and keep it until SIGINT/SIGTERM, then unlink it."""
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with SharedTables.create(name=name) as tables:
+        print(json.dumps({"name": tables.name, "bytes": tables.size}), flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+def _cli():
+    import argparse
+    p = argparse.ArgumentParser(description="Shared-memory moderation tables")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    p.add_argument("--lexicon-size", type=int, default=200_000)
+    p.add_argument("--hold", metavar="NAME",
+                   help="Create the tables as segment NAME and keep them for other processes to attach.")
+    args = p.parse_args()
+    if args.hold:
+        hold(args.hold)
+        return
+    print(json.dumps(benchmark_memory(args.workers, args.lexicon_size), indent=2))
+
+
+if __name__ == "__main__":
+    _cli()
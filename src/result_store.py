@@ -0,0 +1,247 @@
+"""Persistent ``process_post`` result store keyed by content and rule hashes."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+from .interface import process_post
+from .moderation import content_classification_dfa as _dfa
+from .moderation import content_transformation_fst as _fst
+from .moderation import regexRules as _regex_rules
+from .moderation import post_validation_cfg as _cfg
+from .moderation.post_validation_cfg import GRAMMAR
+
+# Bump when pipeline code changes in a way the rule data below does not capture.
+PIPELINE_VERSION = "3"
+
+# SQLite caps bound parameters per statement; stay well below the limit.
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    text_hash   TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    PRIMARY KEY (text_hash, fingerprint)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _describe_dfa(dfa) -> Dict[str, Any]:
+    return {
+        "states": sorted(dfa.states),
+        "start": dfa.start,
+        "accept": sorted(dfa.accept),
+        "delta": sorted([s, a, t] for (s, a), t in dfa.delta.items()),
+    }
+
+
+def pipeline_fingerprint() -> str:
+    """Hash of every rule that influences ``process_post`` output.
+
+    Covers the keyword lists, spam thresholds, DFA definitions, any tables
+    installed with ``use_tables`` (e.g. by ``shared_tables.init_worker``), the
+    tokenizer rules, the textX ``GRAMMAR`` and the markdown preview spec;
+    changing any of them yields a new fingerprint, so entries computed under
+    the old rules are never served again.
+    """
+
+    rules = {
+        "version": PIPELINE_VERSION,
+        "lexicon": {
+            "hate": sorted(_dfa.HATE_KEYWORDS),
+            "offensive": sorted(_dfa.OFFENSIVE_KEYWORDS),
+            "transform_hate": sorted(_fst.HATE_KEYWORDS),
+            "transform_offensive": sorted(_fst.OFFENSIVE_KEYWORDS),
+        },
+        "thresholds": [_dfa.MAX_LINKS_FOR_SAFE, _dfa.MAX_HASHTAGS_FOR_SAFE],
+        "dfas": {
+            "hate": _describe_dfa(_dfa.build_hate_dfa()),
+            "offensive": _describe_dfa(_dfa.build_offensive_dfa()),
+            "spam": _describe_dfa(_dfa.build_spam_dfa()),
+        },
+        "tokenizer": {
+            "token_re": _regex_rules.TOKEN_RE.pattern,
+            "token_types": sorted(_regex_rules.TOKEN_TYPES.items()),
+        },
+        "active_tables": _dfa.active_tables_digest(),
+        "grammar": GRAMMAR,
+        "preview": _cfg._TARGETS["markdown"],
+    }
+    encoded = json.dumps(rules, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def text_hash(post: str) -> str:
+    return hashlib.sha256(post.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """SQLite-backed cache of ``process_post`` results.
+
+    Lookups are batched per call to :meth:`process_many` and new results are
+    buffered and written in a single transaction every ``commit_every``
+    results (or on :meth:`flush` / :meth:`close`).
+    """
+
+    def __init__(self, path: str, commit_every: int = 256):
+        self.path = path
+        self.commit_every = commit_every
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending: Dict[tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._unsaved = {"hits": 0, "misses": 0}
+
+    def get_many(self, posts: Iterable[str], fingerprint: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Return the stored results for ``posts`` (missing posts are omitted)."""
+
+        fingerprint = fingerprint or pipeline_fingerprint()
+        by_hash = {text_hash(p): p for p in posts}
+        found: Dict[str, Dict[str, Any]] = {}
+
+        remaining = []
+        for h, post in by_hash.items():
+            pending = self._pending.get((h, fingerprint))
+            if pending is not None:
+                found[post] = json.loads(pending)
+            else:
+                remaining.append(h)
+
+        for i in range(0, len(remaining), _LOOKUP_BATCH):
+            chunk = remaining[i:i + _LOOKUP_BATCH]
+            marks = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT text_hash, result FROM results WHERE fingerprint = ? AND text_hash IN ({marks})",
+                [fingerprint, *chunk],
+            )
+            for h, result in rows:
+                found[by_hash[h]] = json.loads(result)
+        return found
+
+    def put(self, post: str, result: Dict[str, Any], fingerprint: Optional[str] = None) -> None:
+        fingerprint = fingerprint or pipeline_fingerprint()
+        self._pending[(text_hash(post), fingerprint)] = json.dumps(result, ensure_ascii=False)
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Group-commit buffered results and counters in one transaction."""
+
+        with self._conn:
+            if self._pending:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO results (text_hash, fingerprint, result) VALUES (?, ?, ?)",
+                    [(h, fp, result) for (h, fp), result in self._pending.items()],
+                )
+            for name, value in self._unsaved.items():
+                if value:
+                    self._conn.execute(
+                        "INSERT INTO counters (name, value) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                        (name, value),
+                    )
+        self._pending.clear()
+        self._unsaved = {"hits": 0, "misses": 0}
+
+    def process_many(self, posts: List[str]) -> List[Dict[str, Any]]:
+        """``process_post`` for every post, reusing stored results."""
+
+        fingerprint = pipeline_fingerprint()
+        cached = self.get_many(posts, fingerprint)
+        results = []
+        for post in posts:
+            result = cached.get(post)
+            if result is None:
+                result = process_post(post)
+                cached[post] = result
+                self.put(post, result, fingerprint)
+                self._count("misses")
+            else:
+                self._count("hits")
+            results.append(result)
+        return results
+
+    def process(self, post: str) -> Dict[str, Any]:
+        return self.process_many([post])[0]
+
+    def _count(self, name: str) -> None:
+        setattr(self, name, getattr(self, name) + 1)
+        self._unsaved[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Session and lifetime hit rates plus current/stale entry counts."""
+
+        self.flush()
+        fingerprint = pipeline_fingerprint()
+        totals = dict(self._conn.execute("SELECT name, value FROM counters"))
+        entries, current = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(fingerprint = ?), 0) FROM results", (fingerprint,)
+        ).fetchone()
+
+        def rate(hits, misses):
+            return hits / (hits + misses) if hits + misses else 0.0
+
+        lifetime_hits = totals.get("hits", 0)
+        lifetime_misses = totals.get("misses", 0)
+        return {
+            "fingerprint": fingerprint,
+            "entries": entries,
+            "stale_entries": entries - current,
+            "session": {"hits": self.hits, "misses": self.misses, "hit_rate": rate(self.hits, self.misses)},
+            "lifetime": {
+                "hits": lifetime_hits,
+                "misses": lifetime_misses,
+                "hit_rate": rate(lifetime_hits, lifetime_misses),
+            },
+        }
+
+    def compact(self) -> int:
+        """Delete entries computed under other fingerprints and vacuum the file."""
+
+        self.flush()
+        with self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM results WHERE fingerprint != ?", (pipeline_fingerprint(),)
+            ).rowcount
+        self._conn.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Moderation result store maintenance")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("path", help="Path to the SQLite result store.")
+    args = parser.parse_args()
+
+    with ResultStore(args.path) as store:
+        if args.command == "compact":
+            removed = store.compact()
+            print(json.dumps({"removed": removed, **store.stats()}, indent=2))
+        else:
+            print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
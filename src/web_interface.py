@@ -2,32 +2,270 @@
 
 from __future__ import annotations
 
+import csv
+import itertools
+import json
+import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
 
-from flask import Flask, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 
-from src.interface import process_post
+from src.interface import POLICIES, STAGES, parse_stages, process_post
+from src.moderation.shared_tables import init_worker
 
 TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
 
 app = Flask(__name__, template_folder=str(TEMPLATE_DIR))
 
+# Name of a shared table segment (see ``shared_tables --hold``) that every
+# server worker attaches to on import instead of keeping its own tables.
+SHARED_TABLES_ENV = "MODERATION_SHARED_TABLES"
 
-def _build_context(post_text: str, result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-    return {"post_text": post_text, "result": result}
+
+def attach_shared_tables() -> Optional[str]:
+    name = os.environ.get(SHARED_TABLES_ENV)
+    if name:
+        init_worker(name)
+    return name
+
+
+attach_shared_tables()
+
+# Bulk uploads default to the stages a review table needs; no grammar parse.
+BULK_STAGES = ("classification", "transformation")
+_POST_COLUMNS = ("post", "text", "content", "body")
+
+
+def _build_context(
+    post_text: str,
+    result: Optional[Dict[str, Any]],
+    stages: Sequence[str] = STAGES,
+    policy: str = "full",
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    return {
+        "post_text": post_text,
+        "result": result,
+        "stages": stages,
+        "policy": policy,
+        "all_stages": STAGES,
+        "policies": POLICIES,
+        "error": error,
+    }
 
 
 @app.route("/", methods=["GET", "POST"])
 def moderation_dashboard():
     post_text = ""
     result: Optional[Dict[str, Any]] = None
+    stages: Sequence[str] = STAGES
+    policy = "full"
+    error = None
 
     if request.method == "POST":
         post_text = request.form.get("post_text", "")
-        result = process_post(post_text)
+        policy = request.form.get("policy", "full")
+        try:
+            stages = parse_stages(request.form.getlist("stages") or None)
+            result = process_post(post_text, stages=stages, policy=policy)
+        except ValueError as exc:
+            error = str(exc)
+
+    return render_template(
+        "moderation.html", **_build_context(post_text, result, stages, policy, error)
+    )
+
+
+@app.route("/api/moderate", methods=["POST"])
+def moderate_api():
+    """JSON endpoint: ``{"post": ..., "stages": [...], "policy": ...}``."""
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {
+            "post": request.form.get("post", ""),
+            "stages": request.form.getlist("stages") or request.form.get("stages"),
+            "policy": request.form.get("policy", "full"),
+        }
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    post = payload.get("post", "")
+    if not isinstance(post, str):
+        return jsonify({"error": "'post' must be a string"}), 400
+    stages = payload.get("stages") or None
+    if stages is not None and not isinstance(stages, (str, list)):
+        return jsonify({"error": "'stages' must be a string or a list of strings"}), 400
+    try:
+        result = process_post(post, stages=stages, policy=payload.get("policy") or "full")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
+
+
+def _csv_rows(reader) -> Iterator[Tuple[Optional[list], Optional[str]]]:
+    # a malformed row (e.g. a field over csv.field_size_limit()) only
+    # costs that row; the reader resumes on the next line
+    while True:
+        try:
+            yield next(reader), None
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield None, f"invalid CSV row: {exc}"
+
+
+def _iter_csv(lines) -> Iterator[Tuple[Any, Optional[str], Optional[str]]]:
+    rows = _csv_rows(csv.reader(lines))
+    first, error = next(rows, (None, None))
+    if first is None and error is None:
+        return
+    header = [cell.strip().lower() for cell in first or ()]
+    post_col = next((header.index(c) for c in _POST_COLUMNS if c in header), None)
+    id_col = header.index("id") if "id" in header else None
+    if post_col is None:
+        # no recognised header: the first row is already data
+        post_col = 0
+        rows = itertools.chain([(first, error)], rows)
+    for number, (row, error) in enumerate(rows, start=1):
+        if error is not None:
+            yield number, None, error
+            continue
+        if not row:
+            continue
+        post_id = row[id_col] if id_col is not None and id_col < len(row) else number
+        if post_col >= len(row):
+            yield post_id, None, "missing post column"
+        else:
+            yield post_id, row[post_col], None
+
+
+def _iter_jsonl(lines) -> Iterator[Tuple[Any, Optional[str], Optional[str]]]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"invalid JSON: {exc}"
+            continue
+        if isinstance(item, str):
+            yield number, item, None
+        elif isinstance(item, dict):
+            post = next((item[c] for c in _POST_COLUMNS if isinstance(item.get(c), str)), None)
+            yield item.get("id", number), post, None if post is not None else "missing post field"
+        else:
+            yield number, None, "expected a JSON object or string"
+
+
+def _decode_lines(stream) -> Iterator[str]:
+    # bytes lines decoded one at a time: works on any binary file object,
+    # including spooled temporary files that TextIOWrapper rejects before 3.11
+    first = True
+    for raw in stream:
+        line = raw.decode("utf-8", errors="replace")
+        if first:
+            # drop the byte order mark spreadsheet exports put before the header
+            line = line[1:] if line.startswith("\ufeff") else line
+            first = False
+        yield line
+
+
+def _iter_upload(upload, fmt: Optional[str]) -> Iterator[Tuple[Any, Optional[str], Optional[str]]]:
+    """Yield ``(id, post, error)`` rows from an uploaded CSV or JSONL file.
+
+    Werkzeug has already spooled the whole upload (to disk past a size
+    threshold); rows are then decoded and parsed one line at a time, so
+    parsing memory does not grow with the file size.
+    """
+
+    lines = _decode_lines(upload.stream)
+    if not fmt:
+        name = (upload.filename or "").lower()
+        fmt = "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+    return _iter_jsonl(lines) if fmt == "jsonl" else _iter_csv(lines)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _bulk_row(post_id: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    classification = result["classification"]
+    details = classification["details"]
+    row = {
+        "id": post_id,
+        "post": result["original_post"],
+        "status": classification["status"],
+        "categories": [c for c in ("hate", "offensive", "spam") if details[c]],
+    }
+    transformation = result.get("transformation")
+    if transformation:
+        row["masked"] = transformation["transformed_text"]
+    validation = result.get("validation")
+    if validation:
+        row["validation"] = validation["status"]
+    return row
+
+
+@app.route("/bulk", methods=["POST"])
+def bulk_upload():
+    """Moderate an uploaded CSV/JSONL file, streaming results as server-sent events.
+
+    Emits one ``result`` (or ``error``) event per post as soon as it is
+    processed and a final ``summary`` event with violation counts.
+    Processing starts once the upload has been fully received.
+    """
+
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "Upload a CSV or JSONL file in the 'file' field"}), 400
+    fmt = request.form.get("format") or None
+    if fmt not in (None, "csv", "jsonl"):
+        return jsonify({"error": f"Unknown format: {fmt}"}), 400
+    policy = request.form.get("policy", "full")
+    if policy not in POLICIES:
+        return jsonify({"error": f"Unknown policy: {policy}"}), 400
+    try:
+        stages = parse_stages(request.form.getlist("stages") or BULK_STAGES)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    def generate() -> Iterator[str]:
+        summary = {
+            "total": 0,
+            "safe": 0,
+            "violations": 0,
+            "errors": 0,
+            "by_category": {"hate": 0, "offensive": 0, "spam": 0},
+        }
+        for post_id, post, error in _iter_upload(upload, fmt):
+            summary["total"] += 1
+            if error is not None:
+                summary["errors"] += 1
+                yield _sse("error", {"id": post_id, "error": error})
+                continue
+            try:
+                result = process_post(post, stages=stages, policy=policy)
+            except Exception as exc:
+                summary["errors"] += 1
+                yield _sse("error", {"id": post_id, "error": f"moderation failed: {exc}"})
+                continue
+            row = _bulk_row(post_id, result)
+            if row["status"] == "Safe":
+                summary["safe"] += 1
+            else:
+                summary["violations"] += 1
+            for category in row["categories"]:
+                summary["by_category"][category] += 1
+            yield _sse("result", row)
+        yield _sse("summary", summary)
 
-    return render_template("moderation.html", **_build_context(post_text, result))
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def run() -> None:
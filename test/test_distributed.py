@@ -0,0 +1,129 @@
+import json
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("textx")
+
+from src.distributed import Coordinator, main, run_local, run_worker
+from src.interface import process_post
+
+
+POSTS = [f"post number {i} idiot" if i % 7 == 0 else f"hello world {i}" for i in range(40)]
+
+
+def _client(coordinator, worker_id):
+    sock = socket.create_connection(coordinator.address)
+    stream = sock.makefile("rwb")
+
+    def call(message, reply=True):
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        return json.loads(stream.readline()) if reply else None
+
+    call({"op": "hello", "worker": worker_id})
+    return sock, call
+
+
+def test_local_workers_process_every_post():
+    results, stats = run_local(POSTS, workers=3, chunk_size=5)
+
+    assert sorted(results) == list(range(len(POSTS)))
+    assert results[7]["classification"]["status"] == "Violation"
+    assert results[1] == json.loads(json.dumps(process_post(POSTS[1])))
+    assert stats["completed"] == len(POSTS)
+    assert stats["throughput"] > 0
+    assert sum(w["processed"] for w in stats["workers"].values()) == len(POSTS)
+
+
+def test_expired_lease_is_retried_by_another_worker():
+    with Coordinator(POSTS[:10], chunk_size=5, lease_timeout=0.2, stages="classification") as coordinator:
+        sock, call = _client(coordinator, "stalled")
+        lease = call({"op": "lease"})
+        assert lease["range"] == [0, 5]
+
+        # the stalled worker keeps its connection open but never reports back
+        worker = threading.Thread(target=run_worker, args=(*coordinator.address, "healthy"))
+        worker.start()
+        assert coordinator.wait(10)
+        worker.join()
+        sock.close()
+
+        stats = coordinator.stats()
+        assert stats["completed"] == 10
+        assert stats["requeued"] >= 1
+        assert stats["workers"]["healthy"]["processed"] == 10
+
+
+def test_duplicate_results_are_ignored():
+    with Coordinator(POSTS[:2], chunk_size=2, stages="classification") as coordinator:
+        sock, call = _client(coordinator, "dup")
+        lease = call({"op": "lease"})
+        for post_id, post in lease["items"] + lease["items"][:1]:
+            result = {"original_post": post}
+            call({"op": "result", "lease": lease["lease"], "id": post_id, "result": result}, reply=False)
+        assert call({"op": "complete", "lease": lease["lease"]}) == {"op": "ack"}
+        assert call({"op": "lease"}) == {"op": "done"}
+        sock.close()
+
+        stats = coordinator.stats()
+        assert stats["completed"] == 2
+        assert stats["duplicates"] == 1
+
+
+def test_failing_post_is_reported_not_retried(monkeypatch):
+    import src.distributed as distributed
+
+    def flaky(post, **kwargs):
+        if post == POSTS[3]:
+            raise RuntimeError("boom")
+        return process_post(post, **kwargs)
+
+    monkeypatch.setattr(distributed, "process_post", flaky)
+    with Coordinator(POSTS[:6], chunk_size=3, stages="classification") as coordinator:
+        assert run_worker(*coordinator.address, "w") == 6
+        assert coordinator.wait(5)
+        stats = coordinator.stats()
+
+    assert coordinator.results[3] == {"error": "RuntimeError: boom"}
+    assert coordinator.results[4]["classification"]["status"] == "Safe"
+    assert stats["errors"] == 1
+    assert stats["requeued"] == 0
+    assert stats["workers"]["w"]["errors"] == 1
+
+
+def test_complete_with_missing_results_requeues_chunk():
+    with Coordinator(POSTS[:2], chunk_size=2, stages="classification") as coordinator:
+        sock, call = _client(coordinator, "partial")
+        other_sock, other = _client(coordinator, "other")
+        lease = call({"op": "lease"})
+        post_id, post = lease["items"][0]
+        call({"op": "result", "lease": lease["lease"], "id": post_id, "result": {"original_post": post}}, reply=False)
+        # only the lease holder can complete it
+        assert other({"op": "complete", "lease": lease["lease"]}) == {"op": "ack"}
+        assert coordinator.stats()["outstanding_leases"] == 1
+        assert call({"op": "complete", "lease": lease["lease"]}) == {"op": "ack"}
+
+        retry = call({"op": "lease"})
+        assert retry["op"] == "lease"
+        assert retry["items"] == lease["items"][1:]
+        assert coordinator.stats()["requeued"] == 1
+        sock.close()
+        other_sock.close()
+
+
+def test_run_local_gives_up_without_workers():
+    with pytest.raises(RuntimeError, match="0/3 posts"):
+        run_local(POSTS[:3], workers=0, timeout=5)
+
+
+@pytest.mark.parametrize("option", [["--policy", "nope"], ["--stages", "classification,nope"]])
+def test_cli_rejects_bad_policy_and_stages(tmp_path, monkeypatch, capsys, option):
+    posts = tmp_path / "posts.txt"
+    posts.write_text("hello\n", encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["distributed", "local", str(posts), *option])
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 2
+    assert "nope" in capsys.readouterr().err
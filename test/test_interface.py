@@ -1,3 +1,6 @@
+import multiprocessing
+import pickle
+
 import pytest
 
 pytest.importorskip("textx")
@@ -29,3 +32,67 @@ def test_process_post_aggregates_outputs():
     preview = result["preview"]
     assert isinstance(preview, str)
     assert "Hello" in preview
+
+
+def test_process_post_computes_only_requested_stages():
+    result = process_post("Hello world", stages="classification")
+
+    assert set(result) == {"original_post", "classification"}
+    assert result["classification"]["status"] == "Safe"
+
+    # unrequested stages are computed when first read
+    assert result["validation"]["status"] == "Valid"
+    assert "validation" in result
+    assert "preview" not in result
+
+
+def test_process_post_rejects_unknown_stage_and_policy():
+    with pytest.raises(ValueError):
+        process_post("Hello", stages=["classification", "sentiment"])
+    with pytest.raises(ValueError):
+        process_post("Hello", policy="eventually")
+    with pytest.raises(ValueError):
+        process_post("Hello", stages=5)
+    with pytest.raises(ValueError):
+        process_post("Hello", stages=["classification", None])
+
+
+def test_skip_safe_policy_skips_transformation_and_preview():
+    safe = process_post("Hello world", policy="skip_safe")
+    assert safe["transformation"] is None
+    assert safe["preview"] is None
+    assert safe["validation"]["status"] == "Valid"
+    assert set(safe.skipped) == {"transformation", "preview"}
+
+    violation = process_post("Hello idiot", policy="skip_safe")
+    assert violation["transformation"]["masked_tokens"] == ["idiot"]
+    assert violation.skipped == ()
+
+
+def test_first_violation_policy_stops_after_classification():
+    result = process_post("Hello idiot", policy="first_violation")
+    assert result["classification"]["status"] == "Violation"
+    assert result["transformation"] is None
+    assert result["validation"] is None
+    assert result["preview"] is None
+
+
+def test_result_pickles_without_parse_caches():
+    result = process_post("Hello *world*", policy="skip_safe")
+    assert result.parsed[0] is True
+
+    restored = pickle.loads(pickle.dumps(result))
+    assert restored == result
+    assert restored.skipped == ("transformation", "preview")
+    assert restored._parsed is None
+    # unrequested stages are still computed lazily after the round trip
+    partial = pickle.loads(pickle.dumps(process_post("Hello world", stages="classification")))
+    assert "validation" not in partial
+    assert partial["validation"]["status"] == "Valid"
+
+
+def test_process_pool_map():
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(2) as pool:
+        results = pool.map(process_post, ["Hello world", "you idiot"])
+    assert results == [process_post("Hello world"), process_post("you idiot")]
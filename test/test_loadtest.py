@@ -0,0 +1,90 @@
+import json
+import random
+import time
+
+import pytest
+
+pytest.importorskip("textx")
+pytest.importorskip("flask")
+
+from src import loadtest
+from src.loadtest import LoadConfig, compare_reports, parse_mix, percentiles, run_load, size_sampler
+
+
+def _config(**overrides):
+    values = dict(requests=40, concurrency=4, snapshot_every=20, warmup=4, sizes="uniform:1-8")
+    values.update(overrides)
+    return LoadConfig(**values)
+
+
+def test_inprocess_run_reports_latency_and_memory():
+    report = run_load(_config(mix={"dashboard": 1, "api": 1, "api_light": 1, "bulk": 1}))
+
+    summary = report["summary"]
+    assert summary["requests"] == 40
+    assert summary["errors"] == 0
+    assert summary["error_rate"] == 0.0
+    assert set(summary["latency_ms"]) == {"p50", "p90", "p95", "p99", "max", "mean"}
+    assert summary["latency_ms"]["p50"] <= summary["latency_ms"]["p99"] <= summary["latency_ms"]["max"]
+    assert sum(k["requests"] for k in report["by_kind"].values()) == 40
+
+    memory = report["memory"]
+    assert [s["requests"] for s in memory["snapshots"]] == [0, 20, 40]
+    assert "growth_per_10k_kb" in memory
+    assert "live_textx_models" in memory["snapshots"][-1]["retention"]
+    json.dumps(report)
+
+
+def test_socket_and_direct_transports():
+    for transport in ("socket", "direct"):
+        report = run_load(_config(transport=transport, requests=12, tracemalloc=False))
+        assert report["summary"]["requests"] == 12
+        assert report["summary"]["errors"] == 0
+        assert report["memory"] is None
+
+
+def test_snapshots_are_not_timed(monkeypatch):
+    take = loadtest._MemoryTracker.take
+
+    def slow_take(self, requests):
+        take(self, requests)
+        time.sleep(0.3)
+
+    monkeypatch.setattr(loadtest._MemoryTracker, "take", slow_take)
+    report = run_load(_config(transport="direct", requests=40, snapshot_every=10, concurrency=4))
+    assert len(report["memory"]["snapshots"]) == 5
+    assert report["summary"]["snapshot_pause_s"] >= 1.2
+    assert report["summary"]["latency_ms"]["max"] < 300
+
+
+@pytest.mark.parametrize("field", ["snapshot_every", "concurrency"])
+def test_config_rejects_zero_counts(field):
+    with pytest.raises(ValueError, match=field):
+        _config(**{field: 0})
+
+
+def test_compare_reports_deltas():
+    old = {"summary": {"throughput_rps": 100.0, "error_rate": 0.0, "latency_ms": {"p50": 2.0, "p99": 9.0}},
+           "version": {"pipeline_fingerprint": "a"}}
+    new = {"summary": {"throughput_rps": 120.0, "error_rate": 0.0, "latency_ms": {"p50": 1.5, "p99": 9.0}},
+           "version": {"pipeline_fingerprint": "b"}}
+
+    diff = compare_reports(old, new)
+
+    assert diff["throughput_rps"]["delta"] == 20.0
+    assert diff["latency_p50_ms"]["delta"] == -0.5
+    assert diff["growth_per_10k_kb"]["delta"] is None
+    assert diff["same_pipeline"] is False
+
+
+def test_config_parsing():
+    assert parse_mix("dashboard=1, api_light=3") == {"dashboard": 1.0, "api_light": 3.0}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+    rng = random.Random(0)
+    assert size_sampler("fixed:7")(rng) == 7
+    assert 2 <= size_sampler("uniform:2-5")(rng) <= 5
+    assert size_sampler("lognormal:2,0.5")(rng) >= 1
+    with pytest.raises(ValueError):
+        size_sampler("pareto:1")
+    assert percentiles([0.001, 0.002, 0.003, 0.004])["p50"] == pytest.approx(2.0)
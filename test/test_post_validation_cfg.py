@@ -3,8 +3,14 @@ import pytest
 pytest.importorskip("textx")
 from textx import TextXSyntaxError
 
+from src.moderation import post_validation_cfg
 from src.moderation.post_validation_cfg import (
+    Renderer,
+    RenderTimings,
+    available_targets,
+    register_target,
     validate_post,
+    render_many,
     render_preview,
     _flip_map,
 )
@@ -53,3 +59,63 @@ def test_render_preview_formula_escapes_html():
     preview = render_preview(model)
 
     assert "$ &lt;script&gt;alert(1)&lt;/script&gt; $" in preview
+
+
+def test_render_preview_targets():
+    ok, model = validate_post("Hi -italic- *bold* $a<b$ #math https://test.com")
+    assert ok is True
+
+    html = render_preview(model, target="html")
+    assert "<em>italic</em>" in html
+    assert "<strong>bold</strong>" in html
+    assert "<code>$ a&lt;b $</code>" in html
+    assert "<p><strong>Hashtags:</strong> #math</p>" in html
+
+    text = render_preview(model, target="text")
+    assert text == "Hi italic bold $ a<b $\n\nHashtags: #math\n\nLinks: https://test.com"
+
+    with pytest.raises(ValueError):
+        render_preview(model, target="pdf")
+
+
+def test_render_many_matches_single_renders_and_times_classes():
+    posts = ["~Hello123~ world", "*bold* @alice", "plain words #tag"]
+    models = [validate_post(p)[1] for p in posts]
+    timings = RenderTimings()
+
+    batch = render_many(models, timings=timings)
+
+    assert batch == [render_preview(m) for m in models]
+    report = timings.report()
+    assert report["UpsideDown"]["count"] == 1
+    assert report["Word"]["count"] == 3
+    assert report["HashtagList"]["count"] == 1
+    assert all(entry["total"] >= 0 for entry in report.values())
+
+
+def test_register_target_and_inline_spec():
+    ok, model = validate_post("Hi *bold* #math")
+    assert ok is True
+    spec = {
+        "separator": " ",
+        "Italic": ("/", "/"),
+        "Bold": ("[b]", "[/b]"),
+        "Underline": ("", ""),
+        "AltFont": ("", ""),
+        "Formula": ("", ""),
+        "Hashtags": (" | tags: ", ""),
+        "Links": (" | links: ", ""),
+    }
+    register_target("bbcode", spec)
+    try:
+        assert "bbcode" in available_targets()
+        assert render_preview(model, target="bbcode") == "Hi [b]bold[/b] | tags: #math"
+        with pytest.raises(ValueError):
+            register_target("bbcode", spec)
+    finally:
+        post_validation_cfg._TARGETS.pop("bbcode")
+        post_validation_cfg._renderers.pop("bbcode", None)
+
+    assert Renderer("adhoc", spec=dict(spec, separator="")).render(model) == "Hi[b]bold[/b] | tags: #math"
+    with pytest.raises(ValueError, match="missing: Links"):
+        Renderer("broken", spec={k: v for k, v in spec.items() if k != "Links"})
@@ -0,0 +1,92 @@
+import re
+import sqlite3
+
+import pytest
+
+pytest.importorskip("textx")
+
+from src.interface import process_post
+from src.moderation import content_classification_dfa, post_validation_cfg, regexRules
+from src.moderation.shared_tables import SharedTables, close_worker, init_worker
+from src.result_store import ResultStore, pipeline_fingerprint
+
+
+@pytest.fixture()
+def store(tmp_path):
+    with ResultStore(str(tmp_path / "results.db"), commit_every=2) as s:
+        yield s
+
+
+def test_second_run_is_served_from_store(store):
+    posts = ["Hello world", "you are an idiot", "Hello world"]
+
+    first = store.process_many(posts)
+    second = store.process_many(posts)
+
+    assert first == second == [process_post(p) for p in posts]
+    stats = store.stats()
+    assert stats["session"]["misses"] == 2
+    assert stats["session"]["hits"] == 4
+    assert stats["entries"] == 2
+
+
+def test_results_are_group_committed(tmp_path):
+    path = str(tmp_path / "results.db")
+    with ResultStore(path, commit_every=3) as store:
+        store.process_many(["a", "b"])
+        reader = sqlite3.connect(path)
+        assert reader.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+        store.process("c")
+        assert reader.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 3
+        reader.close()
+
+
+def test_rule_change_invalidates_and_compacts(store, monkeypatch):
+    store.process("hello there")
+    old = pipeline_fingerprint()
+
+    monkeypatch.setattr(content_classification_dfa, "OFFENSIVE_KEYWORDS", {"stupid", "idiot", "there"})
+    assert pipeline_fingerprint() != old
+
+    result = store.process("hello there")
+    assert result["classification"]["status"] == "Violation"
+    assert store.stats()["stale_entries"] == 1
+
+    assert store.compact() == 1
+    stats = store.stats()
+    assert stats["entries"] == 1
+    assert stats["stale_entries"] == 0
+
+
+def test_lifetime_counters_persist(tmp_path):
+    path = str(tmp_path / "results.db")
+    with ResultStore(path) as store:
+        store.process_many(["x", "y"])
+    with ResultStore(path) as store:
+        store.process_many(["x", "y"])
+        stats = store.stats()
+    assert stats["lifetime"] == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+
+
+def test_tokenizer_rules_are_fingerprinted(monkeypatch):
+    old = pipeline_fingerprint()
+    monkeypatch.setattr(regexRules, "TOKEN_RE", re.compile(regexRules.TOKEN_RE.pattern + r"|(\s)"))
+    assert pipeline_fingerprint() != old
+
+
+def test_installed_tables_and_preview_spec_are_fingerprinted(store, monkeypatch):
+    assert store.process("a zebra")["classification"]["status"] == "Safe"
+    before = pipeline_fingerprint()
+
+    with SharedTables.create(offensive_keywords={"zebra"}) as tables:
+        init_worker(tables.name)
+        try:
+            assert pipeline_fingerprint() != before
+            assert store.process("a zebra")["classification"]["status"] == "Violation"
+        finally:
+            close_worker()
+    assert pipeline_fingerprint() == before
+
+    spec = dict(post_validation_cfg._TARGETS["markdown"], Bold=("<b>", "</b>"))
+    monkeypatch.setitem(post_validation_cfg._TARGETS, "markdown", spec)
+    assert pipeline_fingerprint() != before
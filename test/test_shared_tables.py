@@ -0,0 +1,111 @@
+import multiprocessing
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.interface import process_post
+from src.moderation.content_classification_dfa import classify
+from src.moderation.content_transformation_fst import transform
+from src.moderation.shared_tables import SharedTables, close_worker, init_worker, worker_classify
+
+
+POSTS = [
+    "you are stupid",
+    "this contains slur1 example",
+    "go http://a.com http://b.com #wow",
+    "#a #b #c hello",
+    "visit http://a.com #a #b ok",
+    "just a friendly hello world",
+]
+
+
+@pytest.fixture()
+def tables():
+    with SharedTables.create() as t:
+        yield t
+
+
+def test_shared_classification_matches_in_process(tables):
+    for post in POSTS:
+        assert tables.classify(post) == classify(post)
+
+
+def test_attach_reads_same_tables(tables):
+    other = SharedTables.attach(tables.name)
+    try:
+        assert "idiot" in other.lexicons["OFFENSIVE"]
+        assert "slur2" in other.lexicons["HATE"]
+        assert "hello" not in other.lexicons["HATE"]
+        assert other.categorize("IDIOT!") == "OFFENSIVE"
+    finally:
+        other.close()
+
+
+def test_large_lexicon_lookup():
+    words = [f"kw{i:05d}" for i in range(5000)]
+    with SharedTables.create(hate_keywords=words) as t:
+        assert len(t.lexicons["HATE"]) == 5000
+        assert all(w in t.lexicons["HATE"] for w in words[::97])
+        assert "kw99999" not in t.lexicons["HATE"]
+        assert t.classify("hello kw01234").hate is True
+
+
+def test_pool_workers_attach(tables):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(2, initializer=init_worker, initargs=(tables.name,)) as pool:
+        reports = pool.map(worker_classify, POSTS)
+    assert [r["offensive"] for r in reports] == [classify(p).offensive for p in POSTS]
+    assert [r["spam"] for r in reports] == [classify(p).spam for p in POSTS]
+
+
+def test_unlinked_segment_cannot_be_attached():
+    t = SharedTables.create()
+    name = t.name
+    t.close()
+    t.unlink()
+    with pytest.raises(FileNotFoundError):
+        SharedTables.attach(name)
+
+
+def test_independent_process_attach_leaves_segment(tables):
+    # a process the creator did not start has its own resource tracker
+    script = (
+        "from src.moderation.shared_tables import SharedTables\n"
+        f"t = SharedTables.attach({tables.name!r})\n"
+        "print(t.classify('you idiot').offensive)\n"
+        "t.close()\n"
+    )
+    root = Path(__file__).resolve().parents[1]
+    proc = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "True"
+    assert "leaked" not in proc.stderr
+    again = SharedTables.attach(tables.name)
+    assert again.categorize("idiot") == "OFFENSIVE"
+    again.close()
+
+
+def test_init_worker_routes_pipeline_through_tables():
+    with SharedTables.create(offensive_keywords={"zebra"}) as t:
+        init_worker(t.name)
+        try:
+            result = process_post("a zebra here", stages=("classification", "transformation"))
+            assert result["classification"]["status"] == "Violation"
+            assert result["transformation"]["transformed_text"] == "a *** here"
+            assert transform("you idiot").transformed_text == "you idiot"
+        finally:
+            close_worker()
+    assert classify("a zebra here").offensive is False
+    assert classify("you idiot").offensive is True
+
+
+def test_hashed_lexicon_edge_cases():
+    words = ["straße", "中文", "x", "xx", "é" * 40] + [f"w{i}" for i in range(300)]
+    with SharedTables.create(hate_keywords=words, offensive_keywords=[]) as t:
+        hate = t.lexicons["HATE"]
+        assert all(w in hate for w in words)
+        assert not any(w in hate for w in ("", "strasse", "xxx", "w300", "é" * 39, None))
+        assert len(t.lexicons["OFFENSIVE"]) == 0
+        assert "idiot" not in t.lexicons["OFFENSIVE"]
@@ -0,0 +1,68 @@
+import random
+import sys
+
+import pytest
+
+from src.interface import process_post
+from src.moderation.content_classification_dfa import _fallback_extract_all, categorize, classify
+from src.moderation.regexRules import TOKEN_RE, extract_all, token_kind, tokenize, tokenize_typed
+
+PIECES = [
+    "http://", "https://", "http:/", "www.", "h", "t", "p", ":", "/", ".",
+    "@", "#", "_", "a", "Z", "9", "é", "中", "!", ",", "-", "(", ")",
+    "☀", "😄", "🚀", "🤖", " ", "  ", "\t", "\n",
+]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_typed_tokens_match_plain_tokenize(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        text = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+        typed = tokenize_typed(text)
+        assert [t for t, _ in typed] == tokenize(text), text
+        for tok, kind in typed:
+            assert kind == token_kind(tok), text
+
+
+def test_token_types():
+    assert tokenize_typed("@bob! #tag-x 😄 www.a.b") == [
+        ("@bob", "MENTION"), ("!", "WORD"), ("#tag", "HASHTAG"), ("-x", "WORD"),
+        ("😄", "EMOJI"), ("www.a.b", "URL"),
+    ]
+    assert [token_kind(t) for t in ("#tag-x", "httpfoo", "https://a.b", "hi,@bob", "")] == [
+        "HASHTAG", "WORD", "URL", "WORD", "WORD",
+    ]
+    data = extract_all("see www.a.b #x")
+    assert data["tokens"] == ["see", "www.a.b", "#x"]
+    assert data["kinds"] == ["WORD", "URL", "HASHTAG"]
+
+
+def test_token_regex_scales_linearly():
+    # every TOKEN_RE alternative is anchored and \S+ never gives characters
+    # back, so prefix runs that never complete cost one pass
+    for unit in ("@", "www.", "http:/ ", "#a! "):
+        text = unit * (20000 // len(unit))
+        assert "".join(t for t, _ in tokenize_typed(text)) == text.replace(" ", "")
+    assert TOKEN_RE.match("x" * 100000).end() == 100000
+
+
+def test_fallback_keeps_whitespace_tokens_and_types_them():
+    data = _fallback_extract_all("#a! #b? #c. httpfoo hi,@bob")
+    assert data["tokens"] == ["#a!", "#b?", "#c.", "httpfoo", "hi,@bob"]
+    assert data["kinds"] == ["HASHTAG", "HASHTAG", "HASHTAG", "WORD", "WORD"]
+    assert data["mentions"] == ["@bob"]
+
+
+def test_classifier_uses_token_types(monkeypatch):
+    # without the partner regexRules module the classifier uses its fallback
+    monkeypatch.setitem(sys.modules, "regexRules", None)
+    assert categorize("httpfoo", kind="WORD") == "OTHER"
+    assert categorize("httpfoo") == "LINK"
+    rep = classify("go http://a.com www.b.com httpfoo")
+    assert rep.details["symbols"] == ["OTHER", "LINK", "LINK", "OTHER"]
+    assert rep.spam is True
+    assert classify("httpfoo httpbar").spam is False
+
+    post = "Hello @bob! \U0001F604\U0001F604 nice"
+    assert process_post(post)["transformation"]["transformed_text"] == "hello @bob! \U0001F604\U0001F604 nice"
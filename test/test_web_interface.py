@@ -1,9 +1,13 @@
+import io
+import json
+
 import pytest
 
 pytest.importorskip("textx")
 pytest.importorskip("flask")
 
-from src.web_interface import app
+from src.moderation.shared_tables import SharedTables, close_worker
+from src.web_interface import SHARED_TABLES_ENV, _decode_lines, app, attach_shared_tables
 
 
 @pytest.fixture()
@@ -29,3 +33,134 @@ def test_web_interface_displays_analysis(client):
     assert "Validation" in html
     assert "Valid" in html
     assert "Preview" in html
+
+
+def test_web_interface_renders_only_selected_stages(client):
+    response = client.post(
+        "/", data={"post_text": "Hello idiot", "stages": ["classification"]}
+    )
+    assert response.status_code == 200
+
+    html = response.get_data(as_text=True)
+
+    assert "Violation" in html
+    assert "Masked text:" not in html
+    assert "<h2>Preview</h2>" not in html
+
+
+def test_api_moderate_stage_selection(client):
+    response = client.post(
+        "/api/moderate",
+        json={"post": "Hello world", "stages": ["classification"]},
+    )
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert set(payload) == {"original_post", "classification"}
+    assert payload["classification"]["status"] == "Safe"
+
+    response = client.post("/api/moderate", json={"post": "x", "stages": ["nope"]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("payload", [
+    {"post": 123},
+    {"post": ["a"]},
+    {"post": "x", "stages": 5},
+    {"post": "x", "stages": {"classification": True}},
+    {"post": "x", "stages": ["classification", 3]},
+    {"post": "x", "policy": ["full"]},
+])
+def test_api_moderate_rejects_bad_types(client, payload):
+    response = client.post("/api/moderate", json=payload)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def _events(response):
+    events = []
+    for chunk in response.get_data(as_text=True).split("\n\n"):
+        if not chunk.strip():
+            continue
+        lines = dict(line.split(": ", 1) for line in chunk.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_bulk_upload_streams_csv_results(client):
+    data = "id,post\n1,Hello world\n2,you are an idiot\n3,#a #b #c spam\n"
+    response = client.post(
+        "/bulk",
+        data={"file": (io.BytesIO(data.encode("utf-8")), "posts.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/event-stream"
+
+    events = _events(response)
+    results = [data for event, data in events if event == "result"]
+    assert [r["id"] for r in results] == ["1", "2", "3"]
+    assert results[1]["status"] == "Violation"
+    assert results[1]["masked"] == "you are an ***"
+    assert "validation" not in results[0]
+
+    event, summary = events[-1]
+    assert event == "summary"
+    assert summary["total"] == 3
+    assert summary["violations"] == 2
+    assert summary["by_category"] == {"hate": 0, "offensive": 1, "spam": 1}
+
+
+def test_bulk_upload_jsonl_reports_bad_lines(client):
+    data = '{"id": "a", "text": "Hello idiot"}\n"plain string post"\nnot json\n{"id": "b"}\n'
+    response = client.post(
+        "/bulk",
+        data={"file": (io.BytesIO(data.encode("utf-8")), "posts.jsonl"), "stages": ["classification"]},
+        content_type="multipart/form-data",
+    )
+    events = _events(response)
+    assert [event for event, _ in events] == ["result", "result", "error", "error", "summary"]
+    assert events[0][1]["id"] == "a"
+    assert "masked" not in events[0][1]
+    assert events[-1][1]["errors"] == 2
+
+
+def test_bulk_upload_survives_oversized_csv_field(client):
+    data = "\ufeffid,post\n1,hello\n2,\"" + "x" * 200000 + "\"\n3,you idiot\n"
+    response = client.post(
+        "/bulk",
+        data={"file": (io.BytesIO(data.encode("utf-8")), "posts.csv")},
+        content_type="multipart/form-data",
+    )
+    events = _events(response)
+    assert [event for event, _ in events] == ["result", "error", "result", "summary"]
+    # the byte order mark does not hide the id column
+    assert [events[0][1]["id"], events[2][1]["id"]] == ["1", "3"]
+    assert "field larger than field limit" in events[1][1]["error"]
+    assert events[-1][1]["total"] == 3
+    assert events[-1][1]["errors"] == 1
+
+
+def test_upload_lines_decode_from_iterable_binary_stream():
+    class IterOnly:
+        # like SpooledTemporaryFile before 3.11: iterable, but no readable()
+        def __iter__(self):
+            return iter([b"\xef\xbb\xbfid,post\r\n", b"1,caf\xc3\xa9\r\n", b"2,bad \xff\n"])
+
+    assert list(_decode_lines(IterOnly())) == ["id,post\r\n", "1,caf\u00e9\r\n", "2,bad \ufffd\n"]
+
+
+def test_bulk_upload_requires_file(client):
+    response = client.post("/bulk", data={})
+    assert response.status_code == 400
+
+
+def test_workers_attach_tables_named_in_environment(client, monkeypatch):
+    with SharedTables.create(hate_keywords={"zebra"}) as tables:
+        monkeypatch.setenv(SHARED_TABLES_ENV, tables.name)
+        assert attach_shared_tables() == tables.name
+        try:
+            response = client.post("/api/moderate", json={"post": "a zebra", "stages": "classification"})
+            assert response.get_json()["classification"]["status"] == "Violation"
+        finally:
+            close_worker()